@@ -0,0 +1,33 @@
+"""user sso provider
+
+Revision ID: 0b7e4c2f9a85
+Revises: f3d8b5a2c619
+Create Date: 2026-10-18 15:26:53.913470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7e4c2f9a85'
+down_revision: Union[str, None] = 'f3d8b5a2c619'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('provider', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.add_column('users', sa.Column('provider_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    # NULLs are distinct, so password users without a provider don't collide
+    op.create_index('ix_users_provider_provider_id', 'users', ['provider', 'provider_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_provider_provider_id', table_name='users')
+    op.drop_column('users', 'provider_id')
+    op.drop_column('users', 'provider')
@@ -0,0 +1,28 @@
+"""image blob content type
+
+Revision ID: 4e1b7c9a3d52
+Revises: c84f1a6e2d97
+Create Date: 2026-10-18 21:06:37.412905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e1b7c9a3d52'
+down_revision: Union[str, None] = 'c84f1a6e2d97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('image_blobs', sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('image_blobs', 'content_type')
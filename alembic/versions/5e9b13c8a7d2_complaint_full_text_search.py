@@ -0,0 +1,39 @@
+"""complaint full text search
+
+Revision ID: 5e9b13c8a7d2
+Revises: d27a6f3e9b40
+Create Date: 2026-10-18 11:47:15.208664
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9b13c8a7d2'
+down_revision: Union[str, None] = 'd27a6f3e9b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# copied from app.models so later model changes don't rewrite this migration
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(description, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(place, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(note, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    # a stored generated column is filled for existing rows and maintained by postgres on every write
+    op.add_column('complaints', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR_SQL, persisted=True), nullable=True))
+    op.create_index('ix_complaints_search_vector', 'complaints', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_complaints_search_vector', table_name='complaints', postgresql_using='gin')
+    op.drop_column('complaints', 'search_vector')
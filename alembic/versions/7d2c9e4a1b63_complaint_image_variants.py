@@ -0,0 +1,28 @@
+"""complaint image variants
+
+Revision ID: 7d2c9e4a1b63
+Revises: 0b7e4c2f9a85
+Create Date: 2026-10-18 17:02:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2c9e4a1b63'
+down_revision: Union[str, None] = '0b7e4c2f9a85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('complaints', sa.Column('image_variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('complaints', 'image_variants')
@@ -0,0 +1,53 @@
+"""complaint access path indexes
+
+Revision ID: 8c4e2a91f5b3
+Revises: 3b1f0c7d2a10
+Create Date: 2026-10-18 09:40:51.604127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e2a91f5b3'
+down_revision: Union[str, None] = '3b1f0c7d2a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the primary key already is a unique btree on id, these only cost writes
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_constraint('users_id_key', 'users', type_='unique')
+    op.drop_index('ix_complaints_id', table_name='complaints')
+    op.drop_constraint('complaints_id_key', 'complaints', type_='unique')
+
+    # list / per user / status / category queries all sort by (updated_at, id),
+    # built concurrently, outside the migration's transaction, so writes to complaints never wait on them
+    with op.get_context().autocommit_block():
+        op.create_index('ix_complaints_updated_at_id', 'complaints', ['updated_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_complaints_user_id_updated_at_id', 'complaints', ['user_id', 'updated_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_complaints_status_updated_at_id', 'complaints', ['status', 'updated_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_complaints_category_updated_at_id', 'complaints', ['category', 'updated_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_complaints_category_updated_at_id', table_name='complaints', postgresql_concurrently=True)
+        op.drop_index('ix_complaints_status_updated_at_id', table_name='complaints', postgresql_concurrently=True)
+        op.drop_index('ix_complaints_user_id_updated_at_id', table_name='complaints', postgresql_concurrently=True)
+        op.drop_index('ix_complaints_updated_at_id', table_name='complaints', postgresql_concurrently=True)
+
+    op.create_unique_constraint('complaints_id_key', 'complaints', ['id'])
+    op.create_index('ix_complaints_id', 'complaints', ['id'], unique=False)
+    op.create_unique_constraint('users_id_key', 'users', ['id'])
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
@@ -0,0 +1,38 @@
+"""covering user complaints index
+
+Revision ID: a61c0e4d8f27
+Revises: 5e9b13c8a7d2
+Create Date: 2026-10-18 13:20:42.771350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a61c0e4d8f27'
+down_revision: Union[str, None] = '5e9b13c8a7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # same key as ix_complaints_user_id_updated_at_id, which it replaces, plus the "my complaints" summary columns,
+    # the new one is complete before the old one goes, and neither blocks writes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_complaints_user_id_updated_at_id_covering', 'complaints', ['user_id', 'updated_at', 'id'],
+                        unique=False, postgresql_include=['status', 'category', 'place', 'created_at'],
+                        postgresql_concurrently=True)
+        op.drop_index('ix_complaints_user_id_updated_at_id', table_name='complaints', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_complaints_user_id_updated_at_id', 'complaints', ['user_id', 'updated_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_complaints_user_id_updated_at_id_covering', table_name='complaints',
+                      postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""image blobs
+
+Revision ID: c84f1a6e2d97
+Revises: 7d2c9e4a1b63
+Create Date: 2026-10-18 17:48:09.530122
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c84f1a6e2d97'
+down_revision: Union[str, None] = '7d2c9e4a1b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('image_blobs',
+    sa.Column('path', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('digest', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('path')
+    )
+    op.create_index(op.f('ix_image_blobs_digest'), 'image_blobs', ['digest'], unique=False)
+    op.create_index('ix_image_blobs_unreferenced_updated_at', 'image_blobs', ['updated_at'],
+                    unique=False, postgresql_where=sa.text('ref_count <= 0'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_image_blobs_unreferenced_updated_at', table_name='image_blobs')
+    op.drop_index(op.f('ix_image_blobs_digest'), table_name='image_blobs')
+    op.drop_table('image_blobs')
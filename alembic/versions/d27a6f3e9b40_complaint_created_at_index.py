@@ -0,0 +1,32 @@
+"""complaint created_at index
+
+Revision ID: d27a6f3e9b40
+Revises: 8c4e2a91f5b3
+Create Date: 2026-10-18 11:02:37.550913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27a6f3e9b40'
+down_revision: Union[str, None] = '8c4e2a91f5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # listing sorted by created_at and created_* range filters, built without blocking writes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_complaints_created_at_id', 'complaints', ['created_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_complaints_created_at_id', table_name='complaints', postgresql_concurrently=True)
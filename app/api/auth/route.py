@@ -1,22 +1,28 @@
-from fastapi import APIRouter, Depends, Body, status, HTTPException
+from fastapi import APIRouter, Depends, Body, Query, Request, status, HTTPException
 from fastapi.responses import Response
+from typing import Optional
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.common.http_response_model import CommonResponse
 from app.database import db_session
 from app.api.auth.service import AuthService
-from app.schemas import CreateUser, RefreshToken, LoginUser, SsoUserLoginRequest, PasswordResetRequest, PasswordResetRequestRequest
+from app.schemas import CreateUser, RefreshToken, LoginUser, LogoutRequest, SsoUserLoginRequest, PasswordResetRequest, PasswordResetRequestRequest, ActivateUserRequest
 from app.auth.auth_handler import AuthHandler
+from app.auth.throttle import client_address, login_throttle
+from app.auth.user_cache import current_user
+from app.models import User
 
 router = APIRouter()
 
 
 @router.post("/register", name="Register new user")
 async def register_user(
+        request: Request,
         response: Response,
         create_user: CreateUser = Body(...),
         session: AsyncSession = Depends(db_session)):
 
     try:
+        await login_throttle.check("register", client_address(request), create_user.email)
 
         user_service = AuthService(session)
         user = await user_service.create_user(create_user)
@@ -37,6 +43,8 @@ async def register_user(
             payload=None
         )
         response.status_code = http_err.status_code
+        if http_err.headers:
+            response.headers.update(http_err.headers)
         return payload
 
     except Exception as e:
@@ -52,11 +60,14 @@ async def register_user(
 # login a user
 @router.post("/login", name="Login user")
 async def login_user(
+        request: Request,
         response: Response,
         user_data: LoginUser = Body(...),
         session: AsyncSession = Depends(db_session)):
 
     try:
+        # before anything is hashed, bcrypt is the expensive part of a login
+        await login_throttle.check("login", client_address(request), user_data.email)
 
         user_service = AuthService(session)
         access_token = await user_service.authenticate_user(user_data.email, user_data.password.encode('utf-8'))
@@ -77,6 +88,8 @@ async def login_user(
             payload=None
         )
         response.status_code = http_err.status_code
+        if http_err.headers:
+            response.headers.update(http_err.headers)
         return payload
 
     except Exception as e:
@@ -117,15 +130,52 @@ async def refresh_user_token(
         return payload
 
 
-@router.get("/me", name="Get current user by token")
-async def get_user_by_token(
+@router.post("/logout", name="Logout user")
+async def logout_user(
+        request: Request,
         response: Response,
+        logout_data: Optional[LogoutRequest] = Body(None),
         email: str = Depends(AuthHandler()),
         session: AsyncSession = Depends(db_session)):
     try:
         user_service = AuthService(session)
-        user = await user_service.get_user_by_email(email)
+        access_token = request.headers.get("Authorization", "").partition(" ")[2]
+        is_logged_out = await user_service.logout_user(
+            access_token, logout_data.refresh_token if logout_data else None)
+
+        payload = CommonResponse(
+            message="User has been logged out successfully",
+            success=True,
+            payload=is_logged_out,
+            meta=None
+        )
+        response.status_code = status.HTTP_200_OK
+        return payload
+
+    except HTTPException as http_err:
+        payload = CommonResponse(
+            success=False,
+            message=str(http_err.detail),
+            payload=None
+        )
+        response.status_code = http_err.status_code
+        return payload
+
+    except Exception as e:
+        payload = CommonResponse(
+            success=False,
+            message=str(e),
+            payload=None
+        )
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return payload
 
+
+@router.get("/me", name="Get current user by token")
+async def get_user_by_token(
+        response: Response,
+        user: User = Depends(current_user)):
+    try:
         payload = CommonResponse(
             message="User Fetched successfully",
             success=True,
@@ -233,3 +283,82 @@ async def trigger_rest_password_email(
         )
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
         return payload
+
+
+@router.post("/activate", name="Activate a user account")
+async def activate_user(
+        response: Response,
+        activation: ActivateUserRequest = Body(...),
+        session: AsyncSession = Depends(db_session)):
+
+    try:
+
+        user_service = AuthService(session)
+        user = await user_service.activate_user(activation.token)
+
+        payload = CommonResponse(
+            message="User has been activated successfully",
+            success=True,
+            payload=user,
+            meta=None
+        )
+        response.status_code = status.HTTP_200_OK
+        return payload
+
+    except HTTPException as http_err:
+        payload = CommonResponse(
+            success=False,
+            message=str(http_err.detail),
+            payload=None
+        )
+        response.status_code = http_err.status_code
+        return payload
+
+    except Exception as e:
+        payload = CommonResponse(
+            success=False,
+            message=str(e),
+            payload=None
+        )
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return payload
+
+
+# the link in the activation mail, opened straight from the mail client
+@router.get("/activate", name="Activate a user account from the mail link")
+async def activate_user_from_link(
+        response: Response,
+        token: str = Query(..., title="The activation token from the mail"),
+        session: AsyncSession = Depends(db_session)):
+
+    try:
+
+        user_service = AuthService(session)
+        user = await user_service.activate_user(token)
+
+        payload = CommonResponse(
+            message="User has been activated successfully",
+            success=True,
+            payload=user,
+            meta=None
+        )
+        response.status_code = status.HTTP_200_OK
+        return payload
+
+    except HTTPException as http_err:
+        payload = CommonResponse(
+            success=False,
+            message=str(http_err.detail),
+            payload=None
+        )
+        response.status_code = http_err.status_code
+        return payload
+
+    except Exception as e:
+        payload = CommonResponse(
+            success=False,
+            message=str(e),
+            payload=None
+        )
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return payload
@@ -1,12 +1,38 @@
+import asyncio
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.database import db_session
+from sqlalchemy import select, update
+from app.common.logger import logger
+from app.database import db_session, async_session
 from app.models import User
 from app.schemas import CreateUser, SsoUserLoginRequest
 from app.config import settings
 from app.auth.token_handler import JWTTokenHandler
 from app.auth.auth_handler import AuthHandler
+from app.auth.user_cache import user_cache
+from app.auth.revocation import revocation_store
+from app.common.mailer import mail_queue, MailQueueFull
+
+
+# strong references, the event loop only keeps weak ones to running tasks
+_background_tasks = set()
+
+
+# hash again with the current cost, only if the password wasn't changed in the meantime
+async def _rehash_password(auth_handler: AuthHandler, user: User, password: str) -> None:
+    try:
+        hashed_password = await auth_handler.hash_password_async(password)
+        async with async_session() as session:
+            await session.execute(
+                update(User)
+                .where(User.id == user.id, User.hashed_password == user.hashed_password)
+                # a rehash is no edit of the account, updated_at stays as it was
+                .values(hashed_password=hashed_password.decode('utf-8'), updated_at=User.updated_at)
+            )
+            await session.commit()
+        await user_cache.invalidate(user.email)
+    except Exception as e:
+        logger.warning(f"password rehash failed for user {user.id}: {e}")
 
 
 class AuthService:
@@ -39,18 +65,43 @@ class AuthService:
                 status_code=400, detail="User with this email already exists")
 
         # hash password before saving into the db
-        hashed_password = self.auth_handler.hash_password(new_user.password)
+        hashed_password = await self.auth_handler.hash_password_async(new_user.password)
 
         user = User(
             name=new_user.name,
             email=new_user.email,
-            hashed_password=hashed_password
+            hashed_password=hashed_password.decode('utf-8')
         )
         self.session.add(user)
         await self.session.commit()
         await self.session.refresh(user)
 
-        # we need to send an email with activation link to the user // TODO
+        # queued, the worker sends it after the response went out
+        token = self.auth_handler.generate_activation_token(user.email)
+        try:
+            mail_queue.enqueue(
+                user.email,
+                "Activate your account",
+                f"Hi {user.name},\n\nplease activate your account with this link:\n"
+                f"{settings.MAIL_LINK_BASE_URL}/auth/activate?token={token}\n"
+            )
+        except MailQueueFull:
+            # the account is saved either way, the dropped mail is logged and counted
+            pass
+        return user
+
+    async def activate_user(self, token: str) -> User:
+        email = self.auth_handler.verify_activation_token(token)
+        user = await self.get_user_by_email(email)
+        if not user:
+            raise HTTPException(
+                status_code=400, detail="User not found with provided email")
+
+        if not user.is_active:
+            user.is_active = True
+            self.session.add(user)
+            await self.session.commit()
+            await user_cache.invalidate(user.email)
         return user
 
     async def authenticate_user(self, email: str, password: str) -> User:
@@ -60,12 +111,18 @@ class AuthService:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail="User not found", headers={"WWW-Authenticate": "Bearer"})
 
-        is_valid_password = self.auth_handler.verify_password(
+        is_valid_password = await self.auth_handler.verify_password_async(
             password, user.hashed_password)
         if not is_valid_password:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail="Incorrect email or password", headers={"WWW-Authenticate": "Bearer"})
 
+        # stored with an older cost, converge in the background without delaying the login
+        if self.auth_handler.password_needs_rehash(user.hashed_password):
+            task = asyncio.create_task(_rehash_password(self.auth_handler, user, password))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
         access_token = self.token_handler.create_access_token(
             data={"sub": user.email})
         refresh_token = self.token_handler.create_refresh_token(
@@ -89,20 +146,56 @@ class AuthService:
             data={"sub": user.email})
         return {"access_token": access_token, "token_type": "bearer"}
 
+    # revoke the access token of the request and optionally the refresh token that came with it
+    async def logout_user(self, access_token: str, refresh_token: str = None) -> bool:
+        claims = self.token_handler.decode_jwt(access_token)
+        if not claims:
+            raise HTTPException(status_code=400, detail="Invalid token")
+        await revocation_store.revoke_token(self.session, claims)
+
+        if refresh_token:
+            refresh_claims = self.token_handler.decode_jwt(refresh_token)
+            if refresh_claims.get("sub") == claims.get("sub"):
+                await revocation_store.revoke_token(self.session, refresh_claims)
+        return True
+
+    def _token_response(self, user: User) -> dict:
+        access_token = self.token_handler.create_access_token(
+            data={"sub": user.email})
+        refresh_token = self.token_handler.create_refresh_token(
+            data={"sub": user.email})
+        return {
+            "user": user,
+            "access_token": access_token,
+            "refresh_token":
+            refresh_token,
+            "token_type": "bearer"
+        }
+
+    async def get_user_by_provider(self, provider: str, provider_id: str) -> User:
+        user_record = await self.session.execute(
+            select(User).where(User.provider == provider, User.provider_id == provider_id))
+        return user_record.scalar_one_or_none()
+
     async def login_sso_user(self, sso_user: SsoUserLoginRequest):
+        has_provider = bool(sso_user.provider and sso_user.provider_id)
 
-        # check if user exists for given email and provider is null
-        user = await self.get_user_by_email(sso_user.email)
+        # returning users are one read on the (provider, provider_id) index
+        user = None
+        if has_provider:
+            user = await self.get_user_by_provider(sso_user.provider, sso_user.provider_id)
+        if user is None:
+            user = await self.get_user_by_email(sso_user.email)
 
         if user is None:
             # create a new user with random password
             password = self.auth_handler.generate_random_password()
-            hashed_password = self.auth_handler.hash_password(str(password))
+            hashed_password = await self.auth_handler.hash_password_async(str(password))
 
             user = User(
                 name=sso_user.name,
                 email=sso_user.email,
-                hashed_password=hashed_password,
+                hashed_password=hashed_password.decode('utf-8'),
                 profile_image=sso_user.image,
                 provider=sso_user.provider,
                 provider_id=sso_user.provider_id
@@ -111,42 +204,49 @@ class AuthService:
             self.session.add(user)
             await self.session.commit()
             await self.session.refresh(user)
-            access_token = self.token_handler.create_access_token(
-                data={"sub": user.email})
-            refresh_token = self.token_handler.create_refresh_token(
-                data={"sub": user.email})
-            return {
-                "user": user,
-                "access_token": access_token,
-                "refresh_token":
-                refresh_token,
-                "token_type": "bearer"
-            }
-
-        else:
+            return self._token_response(user)
+
+        # only write what the provider actually changed, a plain returning login writes nothing
+        changes = {"name": sso_user.name}
+        if sso_user.image:
+            changes["profile_image"] = sso_user.image
+        if has_provider and not user.provider_id:
+            changes["provider"] = sso_user.provider
+            changes["provider_id"] = sso_user.provider_id
+        changes = {field: value for field, value in changes.items() if getattr(user, field) != value}
 
+        if changes:
+            for field, value in changes.items():
+                setattr(user, field, value)
             self.session.add(user)
             await self.session.commit()
-            await self.session.refresh(user)
-            access_token = self.token_handler.create_access_token(
-                data={"sub": user.email})
-            refresh_token = self.token_handler.create_refresh_token(
-                data={"sub": user.email})
-            return {
-                "user": user,
-                "access_token": access_token,
-                "refresh_token":
-                refresh_token,
-                "token_type": "bearer"
-            }
+            await user_cache.invalidate(user.email)
+
+        return self._token_response(user)
 
     async def send_reset_password_email(self, email: str):
+        user = await self.get_user_by_email(email)
+        # same answer whether the email is registered or not
+        if not user:
+            return None
 
         token = self.auth_handler.generate_token_for_rest_password_email(email)
-        link = f"/auth/reset-password?token={token}"
 
-        # TODO: add mail service to send actual mail
-        return link
+        # only queued here, the request never waits on smtp
+        try:
+            queued = mail_queue.enqueue(
+                email,
+                "Reset your password",
+                f"Hi {user.name},\n\nuse this link to reset your password, it expires in "
+                f"{settings.EMAIL_EXPIRE_SECONDS // 60} minutes:\n{settings.MAIL_RESET_PASSWORD_URL}?token={token}\n")
+        except MailQueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Mail delivery is busy, try again later")
+
+        # the link only ever reaches the caller in local development, never in place of a mail
+        if not queued and settings.MAIL_RETURN_RESET_LINK:
+            return f"/auth/reset-password?token={token}"
+        return None
 
     async def rest_user_password(self, password: str, token: str):
         email = self.auth_handler.verify_reset_password_token(token)
@@ -161,9 +261,11 @@ class AuthService:
                 status_code=400, detail="User not found with provided email")
 
         # update user password
-        hashed_password = self.auth_handler.hash_password(password)
+        hashed_password = await self.auth_handler.hash_password_async(password)
         user.hashed_password = hashed_password.decode('utf-8')
         self.session.add(user)
         await self.session.commit()
+        await user_cache.invalidate(user.email)
+        await revocation_store.revoke_subject(self.session, user.email)
         await self.session.refresh(user)
         return user
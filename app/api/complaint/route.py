@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, status, Query, Path, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, Request, status, Query, Path, UploadFile, File, Form, HTTPException
 from fastapi.responses import Response
 from typing import List, Optional
+from datetime import datetime
 from sqlmodel.ext.asyncio.session import AsyncSession
 from pydantic import UUID4
 
 from app.common.http_response_model import CommonResponse
-from app.database import db_session
+from app.common.counting import CountStrategy
+from app.common.pagination import SortOrder
+from app.config import settings
+from app.database import db_session, db_read_session
 from app.api.complaint.service import ComplaintService
-from app.models import Complaint
-from app.schemas import CreateComplaint, UpdateComplaint
+from app.models import Complaint, User
+from app.schemas import CreateComplaint, UpdateComplaint, ComplaintFilter, ComplaintSort, ComplaintSummary
+from app.auth.user_cache import current_user
 router = APIRouter()
 
 
@@ -18,11 +23,37 @@ async def get_collections(
         page: int = Query(1, ge=1),
         per_page: int =
         Query(100, ge=0),
-        session: AsyncSession = Depends(db_session)):
+        cursor: Optional[str] = Query(
+            None, description="next_cursor of the previous page, overrides page"),
+        count: Optional[CountStrategy] = Query(
+            None, description="How to compute the totals, defaults to COUNT_STRATEGY, "
+                              "or CURSOR_COUNT_STRATEGY with a cursor"),
+        complaint_status: Optional[str] = Query(None, alias="status"),
+        category: Optional[str] = Query(None),
+        user_id: Optional[UUID4] = Query(None),
+        created_from: Optional[datetime] = Query(None),
+        created_to: Optional[datetime] = Query(None),
+        updated_from: Optional[datetime] = Query(None),
+        updated_to: Optional[datetime] = Query(None),
+        sort: ComplaintSort = Query(ComplaintSort.updated_at),
+        order: SortOrder = Query(SortOrder.desc),
+        session: AsyncSession = Depends(db_read_session)):
 
     try:
         complaint_service = ComplaintService(session)
-        complaints, page_meta = await complaint_service.get_all_complaints(page, per_page)
+        filters = ComplaintFilter(
+            status=complaint_status,
+            category=category,
+            user_id=user_id,
+            created_from=created_from,
+            created_to=created_to,
+            updated_from=updated_from,
+            updated_to=updated_to,
+            sort=sort,
+            order=order
+        )
+        complaints, page_meta = await complaint_service.get_all_complaints(
+            page, per_page, cursor, count, filters)
         payload = CommonResponse[List[Complaint]](
             message="Successfully fetched complaints",
             success=True,
@@ -51,12 +82,98 @@ async def get_collections(
         return payload
 
 
+@router.get("/mine", name="Get complaints of the current user")
+async def get_my_complaints(
+        response: Response,
+        per_page: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(
+            None, description="next_cursor of the previous page"),
+        user: User = Depends(current_user),
+        session: AsyncSession = Depends(db_read_session)):
+
+    try:
+        complaint_service = ComplaintService(session)
+        complaints, page_meta = await complaint_service.get_user_complaints(user.id, per_page, cursor)
+        payload = CommonResponse[List[ComplaintSummary]](
+            message="Successfully fetched complaints",
+            success=True,
+            payload=complaints,
+            meta=page_meta
+        )
+        response.status_code = status.HTTP_200_OK
+        return payload
+
+    except HTTPException as http_err:
+        payload = CommonResponse(
+            success=False,
+            message=str(http_err.detail),
+            payload=None
+        )
+        response.status_code = http_err.status_code
+        return payload
+
+    except Exception as e:
+        payload = CommonResponse(
+            success=False,
+            message=str(e),
+            payload=None
+        )
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return payload
+
+
+@router.get("/search", name="Search complaints")
+async def search_complaints(
+        response: Response,
+        q: str = Query(..., min_length=1, max_length=256,
+                       description="Search words, supports \"quoted phrases\", OR and -exclusions"),
+        page: int = Query(1, ge=1),
+        per_page: int = Query(20, ge=1, le=100),
+        count: Optional[CountStrategy] = Query(
+            None, description="How to compute the totals, defaults to COUNT_STRATEGY"),
+        complaint_status: Optional[str] = Query(None, alias="status"),
+        category: Optional[str] = Query(None),
+        session: AsyncSession = Depends(db_read_session)):
+
+    try:
+        complaint_service = ComplaintService(session)
+        filters = ComplaintFilter(status=complaint_status, category=category)
+        complaints, page_meta = await complaint_service.search_complaints(
+            q, page, per_page, count, filters)
+        payload = CommonResponse[List[Complaint]](
+            message="Successfully searched complaints",
+            success=True,
+            payload=complaints,
+            meta=page_meta
+        )
+        response.status_code = status.HTTP_200_OK
+        return payload
+
+    except HTTPException as http_err:
+        payload = CommonResponse(
+            success=False,
+            message=str(http_err.detail),
+            payload=None
+        )
+        response.status_code = http_err.status_code
+        return payload
+
+    except Exception as e:
+        payload = CommonResponse(
+            success=False,
+            message=str(e),
+            payload=None
+        )
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return payload
+
+
 @router.get("/{complaint_id}", name="Get complaint by id")
 async def get_complaint_by_id(
     response: Response,
     complaint_id: UUID4 = Path(...,
                                title="The ID of the complaint to fetch"),
-    session: AsyncSession = Depends(db_session)
+    session: AsyncSession = Depends(db_read_session)
 ):
 
     try:
@@ -150,6 +267,57 @@ async def create_collection(
         return payload
 
 
+@router.post("/bulk", name="Create complaints in bulk")
+async def bulk_create_complaints(
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(db_session)):
+    """
+    Body is a JSON array of complaints or NDJSON (`Content-Type: application/x-ndjson`),
+    one complaint per line. Each row has the fields of a single complaint, `images` may only
+    reference images already stored by an earlier upload.
+    """
+
+    try:
+        # refused before a byte is read when the client says up front how large it is
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > settings.BULK_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.BULK_MAX_BYTES} bytes per request")
+
+        complaint_service = ComplaintService(session)
+        rows = complaint_service.iter_bulk_rows(
+            request.stream(), request.headers.get("content-type", ""))
+        result = await complaint_service.bulk_create_complaints(rows)
+
+        payload = CommonResponse(
+            success=result["failed"] == 0,
+            message=f"{result['created']} complaints created, {result['failed']} failed",
+            payload=result
+        )
+        response.status_code = status.HTTP_201_CREATED if result["failed"] == 0 else status.HTTP_207_MULTI_STATUS
+        return payload
+
+    except HTTPException as http_err:
+        payload = CommonResponse(
+            success=False,
+            message=str(http_err.detail),
+            payload=None
+        )
+        response.status_code = http_err.status_code
+        return payload
+
+    except Exception as e:
+        payload = CommonResponse(
+            success=False,
+            message="Error creating complaints",
+            payload=str(e)
+        )
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return payload
+
+
 @router.patch("/{complaint_id}", name="Update a complaint")
 async def update_collection(
     response: Response,
@@ -1,49 +1,143 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, UploadFile, HTTPException, status
-from sqlalchemy import select, func
-from pydantic import UUID4
+from sqlalchemy import select, func, literal_column, insert
+from pydantic import UUID4, ValidationError
 from datetime import datetime
-from typing import List
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
+from app.config import settings
 from app.database import db_session
-from app.models import Complaint
-from app.schemas import CreateComplaint, UpdateComplaint
+from app.models import Complaint, COMPLAINT_SEARCH_CONFIG
+from app.schemas import CreateComplaint, UpdateComplaint, ComplaintFilter, ComplaintSummary
 from app.common.http_response_model import PageMeta
-from pathlib import Path
+from app.common.pagination import order_and_seek, next_cursor_for
+from app.common.counting import CountStrategy, count_rows, total_pages_for
 import os
-import aiofiles
+import json
 import uuid
-from app.common.utils import sanitize_string
+from app.common.image_variants import image_variant_worker
+from app.common.blob_store import blob_store, blob_paths, image_paths, is_blob_path
 
 
 class ComplaintService:
     def __init__(self, session: AsyncSession = Depends(db_session)) -> None:
         self.session = session
 
-    # get all complaints
-    async def get_all_complaints(self, page: int, page_size: int) -> list[Complaint]:
-        collections_to_skip = (page - 1) * page_size
+    # only indexed predicates, see the complaint indexes in app/models.py
+    def _filtered_query(self, filters: ComplaintFilter):
+        query = select(Complaint)
+        if filters.status:
+            query = query.where(Complaint.status == filters.status)
+        if filters.category:
+            query = query.where(Complaint.category == filters.category)
+        if filters.user_id:
+            query = query.where(Complaint.user_id == filters.user_id)
+        if filters.created_from:
+            query = query.where(Complaint.created_at >= filters.created_from)
+        if filters.created_to:
+            query = query.where(Complaint.created_at < filters.created_to)
+        if filters.updated_from:
+            query = query.where(Complaint.updated_at >= filters.updated_from)
+        if filters.updated_to:
+            query = query.where(Complaint.updated_at < filters.updated_to)
+        return query
 
-        # Get total number of items
-        total_items = await self.session.execute(select(func.count()).select_from(Complaint))
-        total_items = total_items.scalar()
+    # get all complaints, either by page number or by keyset cursor
+    async def get_all_complaints(
+            self,
+            page: int,
+            page_size: int,
+            cursor: Optional[str] = None,
+            count_strategy: Optional[CountStrategy] = None,
+            filters: Optional[ComplaintFilter] = None) -> list[Complaint]:
+        filters = filters or ComplaintFilter()
+        query = self._filtered_query(filters)
 
-        # Calculate total pages
-        total_pages = -(-total_items // page_size)
+        # Get total number of items, exact / cached / estimated or skipped
+        if cursor and count_strategy is None:
+            count_strategy = CountStrategy(settings.CURSOR_COUNT_STRATEGY)
+        total_items = await count_rows(
+            self.session, query, Complaint.__tablename__, count_strategy)
+
+        sort_column = getattr(Complaint, filters.sort.value)
+        query = order_and_seek(query, sort_column, Complaint.id, filters.order, cursor)
+        if cursor:
+            page = None
+        else:
+            query = query.offset((page - 1) * page_size)
 
         # Fetch paginated items
-        collection_list = await self.session.execute(
-            select(Complaint)
-            .offset(collections_to_skip)
-            .order_by(Complaint.updated_at.desc())
-            .limit(page_size)
-        )
+        collection_list = await self.session.execute(query.limit(page_size))
         collections = collection_list.scalars().fetchall()
 
         return collections, PageMeta(
             page=page,
             page_size=page_size,
-            total_pages=total_pages,
+            total_pages=total_pages_for(total_items, page_size),
+            total_items=total_items,
+            next_cursor=next_cursor_for(collections, page_size, filters.sort.value, filters.order)
+        )
+
+    # complaints of one user, newest first, keyset paginated
+    async def get_user_complaints(
+            self,
+            user_id: UUID4,
+            page_size: int,
+            cursor: Optional[str] = None) -> list[ComplaintSummary]:
+
+        # only the columns of ix_complaints_user_id_updated_at_id_covering, so postgres never visits the table
+        query = select(
+            Complaint.id,
+            Complaint.status,
+            Complaint.category,
+            Complaint.place,
+            Complaint.created_at,
+            Complaint.updated_at,
+        ).where(Complaint.user_id == user_id)
+        query = order_and_seek(query, Complaint.updated_at, Complaint.id, cursor=cursor)
+
+        complaint_list = await self.session.execute(query.limit(page_size))
+        complaints = [ComplaintSummary.from_orm(row) for row in complaint_list.all()]
+
+        return complaints, PageMeta(
+            page_size=page_size,
+            next_cursor=next_cursor_for(complaints, page_size)
+        )
+
+    # full text search over description, place and note, best matches first
+    async def search_complaints(
+            self,
+            search_text: str,
+            page: int,
+            page_size: int,
+            count_strategy: Optional[CountStrategy] = None,
+            filters: Optional[ComplaintFilter] = None) -> list[Complaint]:
+        filters = filters or ComplaintFilter()
+        search_vector = Complaint.__table__.c.search_vector
+        ts_query = func.websearch_to_tsquery(
+            literal_column(f"'{COMPLAINT_SEARCH_CONFIG}'::regconfig"), search_text)
+
+        # the @@ match is served by the GIN index, ranking only runs on the matched rows
+        query = self._filtered_query(filters).where(search_vector.op("@@")(ts_query))
+
+        total_items = await count_rows(
+            self.session, query, Complaint.__tablename__, count_strategy)
+
+        complaint_list = await self.session.execute(
+            query
+            .order_by(
+                func.ts_rank_cd(search_vector, ts_query).desc(),
+                Complaint.updated_at.desc(),
+                Complaint.id.desc())
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+        complaints = complaint_list.scalars().fetchall()
+
+        return complaints, PageMeta(
+            page=page,
+            page_size=page_size,
+            total_pages=total_pages_for(total_items, page_size),
             total_items=total_items
         )
 
@@ -62,11 +156,173 @@ class ComplaintService:
     async def create_complaint(self, data: CreateComplaint) -> Complaint:
         complaint = Complaint(**data.dict())
         self.session.add(complaint)
+        await blob_store.add_references(self.session, blob_paths(complaint.images))
         await self.session.commit()
         await self.session.refresh(complaint)
 
+        # thumbnails and variants are rendered after the response, never inside the request
+        image_variant_worker.schedule(complaint.id, complaint.images)
         return complaint
 
+    # counted as it streams in, a body without Content-Length can still be any size
+    @staticmethod
+    async def _limit_bulk_body(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        received = 0
+        async for chunk in body:
+            received += len(chunk)
+            if received > settings.BULK_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"At most {settings.BULK_MAX_BYTES} bytes per request")
+            yield chunk
+
+    # read a bulk upload body as (row index, decoded row) pairs, NDJSON is read line by line as it streams in
+    @classmethod
+    async def iter_bulk_rows(cls, body: AsyncIterator[bytes], content_type: str) -> AsyncIterator[Tuple[int, Any]]:
+        body = cls._limit_bulk_body(body)
+        if content_type.startswith("application/x-ndjson"):
+            index = 0
+            buffer = b""
+            async for chunk in body:
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                # the unfinished line is all that is kept between chunks, so it is what gets capped
+                if any(len(line) > settings.BULK_MAX_LINE_BYTES for line in (*lines, buffer)):
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"At most {settings.BULK_MAX_LINE_BYTES} bytes per complaint")
+                for line in lines:
+                    if line.strip():
+                        yield index, line
+                        index += 1
+            if buffer.strip():
+                yield index, buffer
+            return
+
+        raw = b"".join([chunk async for chunk in body])
+        try:
+            rows = json.loads(raw)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not valid JSON")
+        if not isinstance(rows, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array of complaints")
+        # the whole array is known up front, so refuse it before anything is inserted
+        if len(rows) > settings.BULK_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.BULK_MAX_ROWS} complaints per request")
+        for index, row in enumerate(rows):
+            yield index, row
+
+    # validate one batch, returns the insertable rows and the per row results of the rejected ones
+    @staticmethod
+    def _validate_bulk_batch(batch: List[Tuple[int, Any]]) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+        now = datetime.utcnow()
+        valid, rejected = [], []
+        for index, raw in batch:
+            try:
+                if isinstance(raw, bytes):
+                    raw = json.loads(raw)
+                data = CreateComplaint.parse_obj(raw)
+            except ValidationError as e:
+                rejected.append({"index": index, "success": False, "errors": e.errors()})
+                continue
+            except ValueError as e:
+                rejected.append({"index": index, "success": False, "errors": [{"msg": f"Invalid JSON: {e}"}]})
+                continue
+
+            # only images already in the blob store can be referenced, see BlobStore
+            outside = [path for path in image_paths(data.images) if not is_blob_path(path)]
+            if outside:
+                rejected.append({"index": index, "success": False,
+                                 "errors": [{"msg": f"Not blob store images: {', '.join(outside)}"}]})
+                continue
+            missing = [path for path in blob_paths(data.images) if not os.path.exists(path)]
+            if missing:
+                rejected.append({"index": index, "success": False,
+                                 "errors": [{"msg": f"Images not found: {', '.join(missing)}"}]})
+                continue
+
+            valid.append((index, {
+                **data.dict(),
+                "id": uuid.uuid4(),
+                "status": "pending",
+                "created_at": now,
+                "updated_at": now,
+            }))
+        return valid, rejected
+
+    async def _insert_bulk_batch(self, valid: List[Tuple[int, dict]]) -> List[dict]:
+        if not valid:
+            return []
+        try:
+            # one multi row INSERT and one transaction for the whole batch, image references included
+            await self.session.execute(insert(Complaint.__table__), [row for _, row in valid])
+            await blob_store.add_references(
+                self.session, [path for _, row in valid for path in blob_paths(row["images"])])
+            await self.session.commit()
+        except Exception as e:
+            await self.session.rollback()
+            return [{"index": index, "success": False, "errors": [{"msg": str(e)}]} for index, _ in valid]
+
+        # after the commit, like a single complaint, the variants never hold up the upload
+        for _, row in valid:
+            image_variant_worker.schedule(row["id"], row["images"])
+        return [{"index": index, "success": True, "id": str(row["id"])} for index, row in valid]
+
+    # create complaints in batches, every row gets a result, a bad row never fails the whole upload
+    async def bulk_create_complaints(self, rows: AsyncIterator[Tuple[int, Any]]) -> dict:
+        results = []
+        batch = []
+        truncated = False
+
+        async def flush():
+            valid, rejected = self._validate_bulk_batch(batch)
+            results.extend(rejected)
+            results.extend(await self._insert_bulk_batch(valid))
+            batch.clear()
+
+        index = -1
+        try:
+            async for index, raw in rows:
+                # NDJSON is only counted while it streams and earlier batches are already committed,
+                # stop reading and report what was created instead of failing the request
+                if index >= settings.BULK_MAX_ROWS:
+                    truncated = True
+                    results.append({
+                        "index": index,
+                        "success": False,
+                        "errors": [{"msg": f"At most {settings.BULK_MAX_ROWS} complaints per request, "
+                                           f"this row and the ones after it were not read"}],
+                    })
+                    break
+                batch.append((index, raw))
+                if len(batch) >= settings.BULK_BATCH_SIZE:
+                    await flush()
+        except HTTPException as e:
+            # over a byte limit before anything was committed, the whole request is refused
+            if e.status_code != status.HTTP_413_REQUEST_ENTITY_TOO_LARGE or not results:
+                raise
+            truncated = True
+            results.append({
+                "index": index + 1,
+                "success": False,
+                "errors": [{"msg": f"{e.detail}, this row and the ones after it were not read"}],
+            })
+        if batch:
+            await flush()
+
+        results.sort(key=lambda result: result["index"])
+        created = sum(1 for result in results if result["success"])
+        return {
+            "created": created,
+            "failed": len(results) - created,
+            "truncated": truncated,
+            "results": results,
+        }
+
     # update the complaint
     async def update_complaint(
         self, id: UUID4,
@@ -82,44 +338,34 @@ class ComplaintService:
         # Step 1: Explicitly update the updated_at field
         complaint.updated_at = datetime.utcnow()
 
+        # the replaced images lose a reference, the new ones gain one, in the same transaction
+        if data.images is not None:
+            await blob_store.release(self.session, blob_paths(complaint.images))
+            await blob_store.add_references(self.session, blob_paths(data.images))
+
         # Step 2: Update the fields with new values
         for field, value in data.dict().items():
             if value is not None:  # Only update if the field was provided in the request
                 setattr(complaint, field, value)
+        # the variants belong to the replaced images
+        if data.images is not None:
+            complaint.image_variants = None
 
         # Step 3: Commit the changes
         self.session.add(complaint)
         await self.session.commit()
 
+        if data.images is not None:
+            image_variant_worker.schedule(complaint.id, complaint.images)
         return complaint
 
-    @staticmethod
-    async def save_upload_file(upload_file: UploadFile, destination: Path) -> str:
-        try:
-            async with aiofiles.open(destination, 'wb') as out_file:
-                # Read chunks of 1MB
-                while content := await upload_file.read(1024*1024):
-                    await out_file.write(content)
-            return str(destination)
-        finally:
-            await upload_file.close()
-
     async def get_uploaded_file_path(self, images: List[UploadFile]) -> List[str]:
-        UPLOAD_DIRECTORY = "storage/images"
-        os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
-        image_paths = []
-
-        if images:
-            for image in images:
-                file_name = f"{uuid.uuid4()}-{image.filename}"
-                clean_file_name = sanitize_string(file_name)
-                file_path = Path(UPLOAD_DIRECTORY) / clean_file_name
-
-                # Calling the static method correctly
-                image_path = await ComplaintService.save_upload_file(image, file_path)
-                image_paths.append(image_path)
+        if not images:
+            return []
 
-        return image_paths
+        # stored by content hash, a resubmitted photo reuses the stored copy,
+        # saved concurrently within IMAGE_SAVE_CONCURRENCY_PER_REQUEST / _PER_PROCESS
+        return await blob_store.save_all(images)
 
     # delete the complaint
     # async def delete_collection(self, id: UUID4) -> bool:
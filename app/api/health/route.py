@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import Response
+
+from app.common.http_response_model import CommonResponse
+from app.api.health.service import check_readiness, get_metrics
+from app.auth.user_cache import current_user
+
+router = APIRouter()
+
+
+# liveness never touches the database, a slow database must not get pods restarted
+@router.get("/live", name="Liveness probe")
+async def liveness():
+    return {"message": "I am alive"}
+
+
+@router.get("/ready", name="Readiness probe")
+async def readiness(response: Response):
+    checks = await check_readiness()
+    is_ready = checks["database"] and checks["migrations"]
+
+    response.status_code = status.HTTP_200_OK if is_ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return CommonResponse(
+        success=is_ready,
+        message="Ready" if is_ready else "Not ready",
+        payload=checks,
+        meta=None
+    )
+
+
+# pool, queue and cache internals, for operators only, also when AUTH_MIDDLEWARE_ENABLED is off
+@router.get("/metrics", name="Process metrics", dependencies=[Depends(current_user)])
+async def metrics():
+    return CommonResponse(
+        success=True,
+        message="Metrics of this worker process",
+        payload=get_metrics(),
+        meta=None
+    )
@@ -0,0 +1,90 @@
+import asyncio
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, Optional
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import async_engine, get_pool_status
+from app.auth.token_cache import verified_token_cache
+from app.auth.revocation import revocation_store
+from app.common.mailer import mail_queue
+from app.common.storage import object_storage
+from app.common.image_variants import image_variant_worker
+from app.common.blob_store import blob_store
+
+ALEMBIC_INI = Path(__file__).resolve().parents[3] / "alembic.ini"
+
+
+# the scripts only change with a deploy, read them once per process
+@lru_cache(maxsize=1)
+def _script_directory() -> Optional[ScriptDirectory]:
+    if not ALEMBIC_INI.exists():
+        return None
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return ScriptDirectory.from_config(config)
+
+
+@lru_cache(maxsize=1)
+def get_head_revision() -> Optional[str]:
+    script = _script_directory()
+    return script.get_current_head() if script else None
+
+
+@lru_cache(maxsize=1)
+def get_known_revisions() -> FrozenSet[str]:
+    script = _script_directory()
+    return frozenset(revision.revision for revision in script.walk_revisions()) if script else frozenset()
+
+
+# during a rolling deploy the database can already be migrated past this code's head,
+# a revision these scripts don't know is newer, a known one other than the head is behind
+def is_migrated(current_revision: Optional[str]) -> bool:
+    head_revision = get_head_revision()
+    if head_revision is None or current_revision == head_revision:
+        return True
+    return current_revision is not None and current_revision not in get_known_revisions()
+
+
+async def _current_revision() -> Optional[str]:
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        return result.scalar_one_or_none()
+
+
+async def check_readiness() -> dict:
+    head_revision = get_head_revision()
+    checks = {
+        "database": False,
+        "migrations": False,
+        "current_revision": None,
+        "head_revision": head_revision,
+        "pool": get_pool_status(),
+    }
+    try:
+        current_revision = await asyncio.wait_for(
+            _current_revision(), timeout=settings.READINESS_TIMEOUT_SECONDS)
+    except Exception as e:
+        checks["error"] = str(e) or e.__class__.__name__
+        return checks
+
+    checks["database"] = True
+    checks["current_revision"] = current_revision
+    checks["migrations"] = is_migrated(current_revision)
+    return checks
+
+
+def get_metrics() -> dict:
+    return {
+        "pool": get_pool_status(),
+        "token_cache": verified_token_cache.stats(),
+        "token_revocations": revocation_store.stats(),
+        "mail_queue": mail_queue.stats(),
+        "object_storage": object_storage.stats(),
+        "image_variants": image_variant_worker.stats(),
+        "image_blobs": blob_store.stats(),
+    }
@@ -5,7 +5,8 @@ from app.common.http_response_model import CommonResponse
 from app.database import db_session
 from app.api.user.service import UserService
 from app.schemas import UpdateUser, ChangePasswordRequest
-from app.auth.auth_handler import AuthHandler
+from app.auth.user_cache import current_user
+from app.models import User
 
 
 router = APIRouter()
@@ -15,12 +16,12 @@ router = APIRouter()
 async def register_user(
         response: Response,
         update_user: UpdateUser = Body(...),
-        email: str = Depends(AuthHandler()),
+        user: User = Depends(current_user),
         session: AsyncSession = Depends(db_session)) -> CommonResponse:
     try:
 
         user_service = UserService(session)
-        user = await user_service.update_user(email, update_user)
+        user = await user_service.update_user(user, update_user)
 
         payload = CommonResponse(
             message="User has been updated successfully",
@@ -53,12 +54,12 @@ async def register_user(
 @router.delete("/delete", name="Delete user details")
 async def register_user(
         response: Response,
-        email: str = Depends(AuthHandler()),
+        user: User = Depends(current_user),
         session: AsyncSession = Depends(db_session)) -> CommonResponse:
     try:
 
         user_service = UserService(session)
-        user = await user_service.delete_user(email)
+        user = await user_service.delete_user(user)
 
         payload = CommonResponse(
             message="User has been deleted successfully",
@@ -91,12 +92,12 @@ async def register_user(
 @router.patch("/change-password", name="Change current logged in user password")
 async def change_current_user_password(
         response: Response,
-        email: str = Depends(AuthHandler()),
+        user: User = Depends(current_user),
         change_password: ChangePasswordRequest = Body(...),
         session: AsyncSession = Depends(db_session)) -> CommonResponse:
     try:
         user_service = UserService(session)
-        is_changed = await user_service.change_password(email, change_password.current_password, change_password.new_password)
+        is_changed = await user_service.change_password(user, change_password.current_password, change_password.new_password)
 
         payload = CommonResponse(
             message="User password has changed successfully",
@@ -9,6 +9,8 @@ from app.schemas import UpdateUser
 from app.config import settings
 from app.auth.token_handler import JWTTokenHandler
 from app.auth.auth_handler import AuthHandler
+from app.auth.user_cache import user_cache
+from app.auth.revocation import revocation_store
 
 class UserService:
   def __init__(
@@ -29,11 +31,19 @@ class UserService:
     user = user_record.scalar_one_or_none()
     return user
 
-  # update user by user email
-  async def update_user(self, email: str, update_data: UpdateUser) -> User:
-    user = await self.get_user_by_email(email)
+  # the user resolved by current_user may come from the cache, credential checks and
+  # writes work on the row as the primary has it now
+  async def reload_user(self, user: User) -> User:
+    user_record = await self.session.execute(select(User).where(User.id == user.id))
+    user = user_record.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user
+
+  # update the current user
+  async def update_user(self, user: User, update_data: UpdateUser) -> User:
+    user = await self.reload_user(user)
+    email = user.email
 
     update_data_dict = update_data.dict(exclude_unset=True)
     if 'email' in update_data_dict:
@@ -46,38 +56,40 @@ class UserService:
 
     self.session.add(user)
     await self.session.commit()
+    await user_cache.invalidate(email, user.email)
     await self.session.refresh(user)
 
     # updated user values
     return user
   
-  # delete user by user email
-  async def delete_user(self, email: str) -> bool:
-    user = await self.get_user_by_email(email)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+  # delete the current user
+  async def delete_user(self, user: User) -> bool:
+    user = await self.reload_user(user)
 
     await self.session.delete(user)
     await self.session.commit()
+    await user_cache.invalidate(user.email)
+    await revocation_store.revoke_subject(self.session, user.email)
     return True
   
-   # change user password
-  async def change_password(self, email: str, current_password:str, new_password: str) -> bool:
-    user = await self.get_user_by_email(email)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+   # change the current user password
+  async def change_password(self, user: User, current_password:str, new_password: str) -> bool:
+    user = await self.reload_user(user)
     
     # check if current password is correct
-    is_valid_password = self.auth_handler.verify_password(current_password.encode("utf-8"), user.hashed_password) 
+    is_valid_password = await self.auth_handler.verify_password_async(current_password.encode("utf-8"), user.hashed_password) 
     if not is_valid_password:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Current password is incorrect")
  
     # hash new password
-    hashed_password = self.auth_handler.hash_password(new_password)
+    hashed_password = await self.auth_handler.hash_password_async(new_password)
     user.hashed_password = hashed_password.decode("utf-8")
 
     self.session.add(user)
     await self.session.commit()
+    await user_cache.invalidate(user.email)
+    # sessions on other devices have to log in with the new password
+    await revocation_store.revoke_subject(self.session, user.email)
     await self.session.refresh(user)
     return True
     
\ No newline at end of file
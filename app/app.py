@@ -1,4 +1,5 @@
 # from api.router import api_router
+import asyncio
 from fastapi import FastAPI, status, Request
 from fastapi.responses import UJSONResponse
 from fastapi.responses import JSONResponse
@@ -9,12 +10,21 @@ from sqlmodel import SQLModel
 
 from app.config import settings
 from app.api.router import api_router
-from app.database import async_engine
+from app.database import async_engine, async_session, replicas
+from app.auth.user_cache import user_cache
+from app.auth.revocation import revocation_store
+from app.common.mailer import mail_queue
+from app.common.storage import object_storage
+from app.common.image_variants import image_variant_worker
+from app.common.blob_store import blob_store
+from app.auth.auth_handler import AuthHandler, calibrate_bcrypt_rounds, password_executor
 from app.common.http_response_model import CommonResponse
 from app.common.middleware import log_request_middleware
+from app.common.logger import logger
 from fastapi.middleware.cors import CORSMiddleware
 from app.middlewares.auth_middleware import AuthMiddleware
 
+# only for local development, deployed databases are managed by alembic
 async def init_db():
     async with async_engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
@@ -29,11 +39,44 @@ def get_app() -> FastAPI:
         default_response_class=UJSONResponse,
     )
 
-    # app.add_middleware(AuthMiddleware)
+    # added before CORS so that CORS wraps it and 401s still carry the CORS headers
+    if settings.AUTH_MIDDLEWARE_ENABLED:
+        app.add_middleware(AuthMiddleware)
 
     @app.on_event("startup")
     async def on_startup():
-        await init_db()
+        if settings.DB_CREATE_SCHEMA_ON_STARTUP:
+            await init_db()
+        # server.py calibrates for all workers, this only runs when the app is started some other way
+        if not settings.PASSWORD_HASH_ROUNDS:
+            loop = asyncio.get_running_loop()
+            AuthHandler.bcrypt_rounds = await loop.run_in_executor(password_executor, calibrate_bcrypt_rounds)
+            logger.info(f"bcrypt cost calibrated to {AuthHandler.bcrypt_rounds} rounds")
+        if replicas.engines:
+            await replicas.check_health()
+            app.state.replica_health_task = asyncio.create_task(replicas.run_health_checks())
+        try:
+            async with async_session() as session:
+                await revocation_store.refresh(session)
+        except Exception as e:
+            logger.error(f"token revocations could not be loaded, retrying in the background: {e}")
+        app.state.revocation_refresh_task = asyncio.create_task(revocation_store.run_refresh(async_session))
+        mail_queue.start()
+        if settings.IMAGE_BLOB_CLEANUP_INTERVAL_SECONDS > 0:
+            app.state.blob_cleanup_task = asyncio.create_task(blob_store.run_cleanup(async_session))
+        if settings.USER_CACHE_REDIS_URL:
+            app.state.user_cache_listener_task = asyncio.create_task(user_cache.run_invalidation_listener())
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await mail_queue.stop()
+        object_storage.close()
+        image_variant_worker.close()
+        for name in ("replica_health_task", "user_cache_listener_task", "revocation_refresh_task",
+                     "blob_cleanup_task"):
+            task = getattr(app.state, name, None)
+            if task:
+                task.cancel()
 
     # Configure CORS
     app.add_middleware(
@@ -44,11 +87,10 @@ def get_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    #  index route for health check
+    #  index route for health check, kept for old probes, see /api/v1/health/live and /ready
     @app.get("/api/v1/health-check", name="Health Check")
     async def root():
-        await init_db()
-        return {"message": "I am healthy all db tables are created"}
+        return {"message": "I am healthy"}
 
     app.include_router(router=api_router, prefix="/api/v1")
 
@@ -1,14 +1,47 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union
 import bcrypt
-from itsdangerous import URLSafeTimedSerializer
 from fastapi import Request, Response, status, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.auth.token_handler import JWTTokenHandler
-from datetime import datetime
 from app.common.http_response_model import CommonResponse
 from app.config import settings
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+# and caps how many cores a login burst can take
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+
+# bcrypt time doubles with every round, so time a cheap cost and extrapolate to the target
+def calibrate_bcrypt_rounds() -> int:
+  if settings.PASSWORD_HASH_ROUNDS:
+      return settings.PASSWORD_HASH_ROUNDS
+  probe_rounds = 8
+  probe_seconds = min(
+      _time_hash(probe_rounds) for _ in range(3)
+  )
+  target_seconds = settings.PASSWORD_HASH_TARGET_MS / 1000
+  rounds = probe_rounds + round(math.log2(target_seconds / probe_seconds))
+  return max(BCRYPT_MIN_ROUNDS, min(BCRYPT_MAX_ROUNDS, rounds))
+
+
+def _time_hash(rounds: int) -> float:
+  start = time.perf_counter()
+  bcrypt.hashpw(b"calibration password", bcrypt.gensalt(rounds=rounds))
+  return time.perf_counter() - start
+
+
 class AuthHandler(HTTPBearer):
+  # set once per process at startup, see calibrate_bcrypt_rounds
+  bcrypt_rounds: int = settings.PASSWORD_HASH_ROUNDS or 12
+
   def __init__(self, auto_error: bool = True,   token_handler: JWTTokenHandler = JWTTokenHandler()):
         super(AuthHandler, self).__init__(auto_error=auto_error)
         self.token_handler = token_handler
@@ -32,7 +65,12 @@ class AuthHandler(HTTPBearer):
             )
             response.status_code = 403
             return payload
-        email = self.verify_jwt(credentials.credentials, response)
+        # already decoded by AuthMiddleware
+        claims = getattr(request.state, "token_claims", None)
+        if claims:
+            email = claims.get("sub")
+        else:
+            email = self.verify_jwt(credentials.credentials, response)
         if not email:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, 
@@ -50,8 +88,7 @@ class AuthHandler(HTTPBearer):
         payload = self.token_handler.decode_jwt(jwtoken)
 
         token_expiry_timestamp = payload.get("exp")
-        current_timestamp = datetime.utcnow().timestamp()
-        token_expired = current_timestamp > token_expiry_timestamp
+        token_expired = time.time() > token_expiry_timestamp
         if token_expired:
             payload = CommonResponse(
               success=False,
@@ -68,26 +105,49 @@ class AuthHandler(HTTPBearer):
         return None
 
   def hash_password(self, password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=AuthHandler.bcrypt_rounds))
   
   def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    if isinstance(plain_password, str):
+        plain_password = plain_password.encode('utf-8')
     return bcrypt.checkpw(plain_password, hashed_password.encode('utf-8'))
+
+  # a hash stored with another cost than the current one, eg. "$2b$10$..." while running with 12 rounds
+  def password_needs_rehash(self, hashed_password: str) -> bool:
+    try:
+        return int(hashed_password.split("$")[2]) != AuthHandler.bcrypt_rounds
+    except (IndexError, ValueError):
+        return False
   
+  async def hash_password_async(self, password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, self.hash_password, password)
+
+  async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, self.verify_password, plain_password, hashed_password)
+
   def generate_random_password(self) -> str:
     return bcrypt.gensalt()
   
   def generate_token_for_rest_password_email(self, email):
-    serializer = URLSafeTimedSerializer(settings.JWT_SECRET_KEY)
-    return serializer.dumps(email, salt=settings.EMAIL_TOKEN_SALT)
+    return self.token_handler.create_reset_password_token(email)
   
   def verify_reset_password_token(self, token) -> Union[str, bool]:
-    serializer = URLSafeTimedSerializer(settings.JWT_SECRET_KEY)
     try:
-        email = serializer.loads(
-            token,
-            salt=settings.EMAIL_TOKEN_SALT,
-            max_age=settings.EMAIL_EXPIRE_SECONDS
-        )
+        email = self.token_handler.verify_reset_password_token(token)
     except Exception as SignatureExpired:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Rest link has been expired")
-    return email
\ No newline at end of file
+    return email
+
+  def generate_activation_token(self, email):
+    return self.token_handler.create_activation_token(email)
+
+  def verify_activation_token(self, token) -> Union[str, bool]:
+    try:
+        email = self.token_handler.verify_activation_token(token)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Activation link is invalid or has expired")
+    return email
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common.logger import logger
+from app.config import settings
+from app.models import RevokedToken, UserTokenRevocation
+
+
+class BloomFilter:
+    """
+    Fixed size bloom filter, `in` is False for every key that was never added and
+    True for added keys plus a `false_positive_rate` share of the others.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.01) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationStore:
+    """
+    In-process copy of the revoked tokens, checked on every authenticated request.
+
+    Single tokens are revoked by `jti`, the common "not revoked" answer comes from a
+    bloom filter and only its hits are confirmed against the exact set. All tokens of a
+    user are revoked at once by storing the time of revocation, every token of that
+    subject issued before it is rejected.
+
+    Postgres is the source of truth, revocations of this process apply immediately,
+    the ones of other workers after the next background refresh.
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+        self._refreshed_at: Optional[datetime] = None
+        self._full_reload_at = 0.0
+
+    def _reset(self) -> None:
+        self._bloom = BloomFilter(settings.REVOCATION_BLOOM_CAPACITY)
+        self._jti_expiry: Dict[str, float] = {}
+        self._subjects: Dict[str, float] = {}
+
+    def _add_jti(self, jti: str, expires_at: float) -> None:
+        if jti not in self._jti_expiry:
+            self._bloom.add(jti)
+        self._jti_expiry[jti] = expires_at
+
+    def _add_subject(self, subject: str, revoked_at: float) -> None:
+        self._subjects[subject] = max(revoked_at, self._subjects.get(subject, 0.0))
+
+    def is_revoked(self, claims: dict) -> bool:
+        jti = claims.get("jti")
+        if jti and jti in self._bloom and jti in self._jti_expiry:
+            return True
+        revoked_at = self._subjects.get(claims.get("sub"))
+        # tokens from before jti/iat were added have no iat and count as issued at 0
+        return revoked_at is not None and claims.get("iat", 0) < revoked_at
+
+    async def revoke_token(self, session: AsyncSession, claims: dict) -> None:
+        jti, expires_at = claims.get("jti"), claims.get("exp")
+        if not jti or not expires_at:
+            return
+        await session.execute(insert(RevokedToken).values(
+            jti=jti,
+            subject=claims.get("sub"),
+            expires_at=datetime.utcfromtimestamp(expires_at),
+            revoked_at=datetime.utcnow(),
+        ).on_conflict_do_nothing())
+        await session.commit()
+        self._add_jti(jti, expires_at)
+
+    async def revoke_subject(self, session: AsyncSession, subject: str) -> None:
+        # whole seconds, so a token issued in this same second stays valid
+        revoked_at = datetime.utcnow().replace(microsecond=0)
+        statement = insert(UserTokenRevocation).values(subject=subject, revoked_at=revoked_at)
+        await session.execute(statement.on_conflict_do_update(
+            index_elements=[UserTokenRevocation.subject],
+            set_={"revoked_at": statement.excluded.revoked_at}))
+        await session.commit()
+        self._add_subject(subject, _timestamp(revoked_at))
+
+    async def refresh(self, session: AsyncSession) -> None:
+        now = datetime.utcnow()
+        full_reload = time.monotonic() >= self._full_reload_at
+
+        if full_reload:
+            # the only way entries leave the bloom filter is a rebuild
+            await session.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+            # every token issued before such a revocation has expired by now
+            longest_lifetime = timedelta(minutes=max(
+                settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES, settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES))
+            await session.execute(
+                delete(UserTokenRevocation).where(UserTokenRevocation.revoked_at < now - longest_lifetime))
+            await session.commit()
+            since = None
+        else:
+            # overlap with the last refresh so rows of slow commits are not missed
+            since = self._refreshed_at - timedelta(seconds=settings.REVOCATION_REFRESH_OVERLAP_SECONDS)
+
+        token_query = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at >= now)
+        subject_query = select(UserTokenRevocation.subject, UserTokenRevocation.revoked_at)
+        if since:
+            token_query = token_query.where(RevokedToken.revoked_at >= since)
+            subject_query = subject_query.where(UserTokenRevocation.revoked_at >= since)
+        tokens = (await session.execute(token_query)).all()
+        subjects = (await session.execute(subject_query)).all()
+
+        if full_reload:
+            self._reset()
+            self._full_reload_at = time.monotonic() + settings.REVOCATION_FULL_RELOAD_SECONDS
+        for jti, expires_at in tokens:
+            self._add_jti(jti, _timestamp(expires_at))
+        for subject, revoked_at in subjects:
+            self._add_subject(subject, _timestamp(revoked_at))
+        self._refreshed_at = now
+
+    async def run_refresh(self, session_factory) -> None:
+        while True:
+            await asyncio.sleep(settings.REVOCATION_REFRESH_SECONDS)
+            try:
+                async with session_factory() as session:
+                    await self.refresh(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"token revocation refresh failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._jti_expiry),
+            "revoked_subjects": len(self._subjects),
+        }
+
+
+def _timestamp(value: datetime) -> float:
+    # naive datetimes in the database are utc
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+revocation_store = RevocationStore()
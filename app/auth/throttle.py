@@ -0,0 +1,124 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.common.logger import logger
+from app.config import settings
+
+
+# request.client is the X-Forwarded-For address when uvicorn trusts the proxy (FORWARDED_ALLOW_IPS),
+# otherwise every client behind the proxy would share one bucket
+def client_address(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+
+class RateLimitExceeded(HTTPException):
+    def __init__(self, retry_after: float) -> None:
+        retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many attempts, try again in {retry_after} seconds",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class MemoryTokenBuckets:
+    """
+    Token buckets of this worker process, the least recently used keys are dropped
+    past `max_keys` so a flood of random emails can't grow it without limit.
+    """
+
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+        if tokens >= 1:
+            retry_after = 0.0
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_per_second
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisTokenBuckets:
+    """Token buckets shared by every worker, each take is one atomic script call."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local refill = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill)
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) / refill
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill) + 1)
+    return tostring(retry_after)
+    """
+
+    def __init__(self, redis_url: str) -> None:
+        import redis.asyncio as redis
+        self._redis = redis.from_url(redis_url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        retry_after = await self._script(
+            keys=[f"login-throttle:{key}"], args=[capacity, refill_per_second, time.time()])
+        return float(retry_after)
+
+
+class LoginThrottle:
+    """
+    Rejects login and register attempts per client IP and per email before any
+    password is hashed. Falls back to the in-process buckets when redis is unavailable.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None) -> None:
+        self.memory = MemoryTokenBuckets()
+        self.backend = RedisTokenBuckets(redis_url) if redis_url else self.memory
+
+    async def _take(self, key: str, capacity: float, per_minute: float) -> float:
+        try:
+            return await self.backend.take(key, capacity, per_minute / 60)
+        except Exception as e:
+            logger.warning(f"login throttle backend failed, using the in-process buckets: {e}")
+            return await self.memory.take(key, capacity, per_minute / 60)
+
+    async def check(self, action: str, client_ip: Optional[str], email: Optional[str]) -> None:
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+
+        if client_ip:
+            retry_after = await self._take(
+                f"{action}:ip:{client_ip}", settings.LOGIN_THROTTLE_IP_BURST, settings.LOGIN_THROTTLE_IP_PER_MINUTE)
+            if retry_after:
+                raise RateLimitExceeded(retry_after)
+
+        if email:
+            retry_after = await self._take(
+                f"{action}:email:{email.strip().lower()}",
+                settings.LOGIN_THROTTLE_EMAIL_BURST, settings.LOGIN_THROTTLE_EMAIL_PER_MINUTE)
+            if retry_after:
+                raise RateLimitExceeded(retry_after)
+
+
+login_throttle = LoginThrottle(settings.LOGIN_THROTTLE_REDIS_URL)
@@ -1,59 +1,123 @@
 from app.config import settings
 from app.models import User
-from datetime import datetime, timedelta
+from app.auth.token_cache import verified_token_cache
+from app.auth.revocation import revocation_store
+from datetime import timedelta
+from typing import Dict
+import time
+import uuid
 import jwt
+from itsdangerous import URLSafeTimedSerializer
 from fastapi import Depends, HTTPException
 
+
+# keys are prepared once per process, every token names the key it was signed with in its "kid" header
+class SigningKeys():
+
+    def __init__(self, algorithm: str, active_kid: str, active_secret: str, previous_secrets: Dict[str, str] = None):
+        self.algorithm = algorithm
+        self.active_kid = active_kid
+        jwt_algorithm = jwt.get_algorithm_by_name(algorithm)
+        secrets = {**(previous_secrets or {}), active_kid: active_secret}
+        self.keys = {kid: jwt_algorithm.prepare_key(secret) for kid, secret in secrets.items()}
+        self.signing_key = self.keys[active_kid]
+        self.headers = {"kid": active_kid}
+        # itsdangerous takes the same secrets, oldest first and signs with the last one
+        self.serializer_secrets = list(secrets.values())
+
+    def verification_key(self, token: str):
+        if len(self.keys) == 1:
+            return self.signing_key
+        # tokens issued before kid headers existed were signed with the active key
+        kid = jwt.get_unverified_header(token).get("kid", self.active_kid)
+        key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return key
+
+
+signing_keys = SigningKeys(
+    settings.JWT_ALGORITHM,
+    settings.JWT_KEY_ID,
+    settings.JWT_SECRET_KEY,
+    settings.JWT_PREVIOUS_KEYS
+)
+
+reset_password_serializer = URLSafeTimedSerializer(
+    signing_keys.serializer_secrets, salt=settings.EMAIL_TOKEN_SALT)
+activation_serializer = URLSafeTimedSerializer(
+    signing_keys.serializer_secrets, salt=f"{settings.EMAIL_TOKEN_SALT}-activation")
+
+
 class JWTTokenHandler():
-    secret_key = settings.JWT_SECRET_KEY
-    algorithm = settings.JWT_ALGORITHM
-    refresh_token_expire_minutes = settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES
-    
-    
+    keys = signing_keys
+    access_token_expire_seconds = 15 * 60
+    refresh_token_expire_seconds = settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES * 60
+
+    def _encode(self, data: dict, expire_seconds: float) -> str:
+        now = int(time.time())
+        to_encode = {**data, "exp": now + int(expire_seconds), "iat": now, "jti": uuid.uuid4().hex}
+        return jwt.encode(to_encode, self.keys.signing_key, algorithm=self.keys.algorithm, headers=self.keys.headers)
+
     def create_access_token(self, data: dict, expires_delta: timedelta = None):
-        to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-        return encoded_jwt
-    
+        expire_seconds = expires_delta.total_seconds() if expires_delta else self.access_token_expire_seconds
+        return self._encode(data, expire_seconds)
+
     def create_refresh_token(self, data: dict, expires_delta: timedelta = None):
-      if expires_delta:
-          expire = datetime.utcnow() + expires_delta
-      else:
-          expire = datetime.utcnow() + timedelta(minutes=self.refresh_token_expire_minutes)
-      to_encode = data.copy()
-      to_encode.update({"exp": expire})
-      encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-      return encoded_jwt
-    
+      expire_seconds = expires_delta.total_seconds() if expires_delta else self.refresh_token_expire_seconds
+      return self._encode(data, expire_seconds)
+
+    # signature and exp only, no cache and no revocation check
+    def verify(self, token: str) -> dict:
+        return jwt.decode(token, self.keys.verification_key(token), algorithms=[self.keys.algorithm])
+
     async def validate_refresh_token(self, refresh_token: str) -> str:
         try:
-            payload = jwt.decode(refresh_token, self.secret_key, algorithms=[self.algorithm])
+            payload = self.verify(refresh_token)
             email = payload.get("sub")
             if email is None:
                 raise HTTPException(status_code=400, detail="Invalid token")
-            
+
+            if revocation_store.is_revoked(payload):
+                raise HTTPException(status_code=400, detail="Token has been revoked")
+
             token_expiry_timestamp = payload.get("exp")
-            current_timestamp = datetime.utcnow().timestamp()
-            token_expired = current_timestamp > token_expiry_timestamp
+            token_expired = time.time() > token_expiry_timestamp
             if token_expired:
                 raise HTTPException(status_code=400, detail="Token has expired")
-            
+
             return email
 
         except jwt.PyJWTError:
             raise HTTPException(status_code=400, detail="Invalid token")
-        
+
     def decode_jwt(self, token: str) -> dict:
-      try:
-          decoded_token = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-          return decoded_token
-      except:
+      claims = verified_token_cache.get(token)
+      if claims is None:
+          try:
+              claims = self.verify(token)
+          except:
+              return {}
+          verified_token_cache.put(token, claims)
+
+      # in memory, no round trip, see RevocationStore
+      if revocation_store.is_revoked(claims):
+          verified_token_cache.discard(token)
           return {}
-    
+      return claims
+
+    def create_reset_password_token(self, email: str) -> str:
+        return reset_password_serializer.dumps(email)
+
+    # raises itsdangerous.BadSignature, SignatureExpired when older than EMAIL_EXPIRE_SECONDS
+    def verify_reset_password_token(self, token: str) -> str:
+        return reset_password_serializer.loads(token, max_age=settings.EMAIL_EXPIRE_SECONDS)
+
+    def create_activation_token(self, email: str) -> str:
+        return activation_serializer.dumps(email)
+
+    def verify_activation_token(self, token: str) -> str:
+        return activation_serializer.loads(token, max_age=settings.ACTIVATION_EXPIRE_SECONDS)
+
 
 
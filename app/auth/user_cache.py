@@ -0,0 +1,124 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.auth.auth_handler import AuthHandler
+from app.common.logger import logger
+from app.config import settings
+from app.database import db_session
+from app.models import User
+
+INVALIDATION_CHANNEL = "user-cache:invalidate"
+
+
+class UserCache:
+    """
+    Per process TTL cache of user rows by email.
+    With USER_CACHE_REDIS_URL set, invalidations are published to redis so every
+    worker drops its copy, without it they only reach the current process.
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int, redis_url: Optional[str] = None) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.redis_url = redis_url
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._redis = None
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(self.redis_url)
+        return self._redis
+
+    def get(self, email: str) -> Optional[User]:
+        entry = self._entries.get(email)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[email]
+            return None
+        self._entries.move_to_end(email)
+
+        # a fresh detached instance per request, callers can attach and modify it freely
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user: User) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        values = {column.key: getattr(user, column.key) for column in User.__mapper__.column_attrs}
+        self._entries[user.email] = (time.monotonic() + self.ttl_seconds, values)
+        self._entries.move_to_end(user.email)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, email: str) -> None:
+        self._entries.pop(email, None)
+
+    async def invalidate(self, *emails: str) -> None:
+        for email in emails:
+            self.discard(email)
+        if not self.redis_url:
+            return
+        try:
+            client = self._get_redis()
+            for email in emails:
+                await client.publish(INVALIDATION_CHANNEL, email)
+        except Exception as e:
+            # other workers still drop the entry when its TTL runs out
+            logger.warning(f"user cache invalidation was not published: {e}")
+
+    async def run_invalidation_listener(self) -> None:
+        while True:
+            try:
+                pubsub = self._get_redis().pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # whatever was missed while disconnected
+                self._entries.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.discard(message["data"].decode("utf-8"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"user cache invalidation listener failed, retrying: {e}")
+                await asyncio.sleep(1)
+
+
+user_cache = UserCache(
+    settings.USER_CACHE_TTL_SECONDS,
+    settings.USER_CACHE_SIZE,
+    settings.USER_CACHE_REDIS_URL,
+)
+
+
+# resolves the user of the bearer token, from the cache when possible, misses read the
+# primary, a lagging replica would put a row back that an update just invalidated
+async def current_user(
+        email: str = Depends(AuthHandler()),
+        session: AsyncSession = Depends(db_session)) -> User:
+    # AuthHandler answers some failures with a response body instead of raising
+    if not isinstance(email, str):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token or expired token.")
+
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
+    user_record = await session.execute(select(User).where(User.email == email))
+    user = user_record.scalar_one_or_none()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    user_cache.put(user)
+    return user
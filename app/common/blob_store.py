@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import aiofiles
+from fastapi import UploadFile
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common.image_variants import VARIANT_DIRECTORY
+from app.common.logger import logger
+from app.config import settings
+from app.models import ImageBlob
+
+BLOB_DIRECTORY = "storage/images/blobs"
+TEMP_DIRECTORY = f"{BLOB_DIRECTORY}/tmp"
+# blobs/<first two hex digits>/<sha256>, nothing else is ever written by the store,
+# blobs stored before the content type was recorded also carry the upload's extension
+BLOB_PATH_PATTERN = re.compile(
+    rf"{re.escape(BLOB_DIRECTORY)}/(?P<prefix>[0-9a-f]{{2}})/(?P<digest>(?P=prefix)[0-9a-f]{{62}})(\.[a-z0-9]{{1,10}})?")
+
+# the first bytes decide, the client's filename and content type can't be trusted
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_content_type(head: bytes) -> str:
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1"):
+        return "image/heic"
+    return "application/octet-stream"
+
+
+def is_blob_path(path: str) -> bool:
+    if not BLOB_PATH_PATTERN.fullmatch(path):
+        return False
+    # the pattern already rules out "..", resolving also rules out symlinks leading elsewhere
+    return Path(path).resolve().is_relative_to(Path(BLOB_DIRECTORY).resolve())
+
+
+def image_paths(images) -> List[str]:
+    if not images:
+        return []
+    return [path.strip() for path in images.split(",") if path.strip()]
+
+
+def blob_paths(images) -> List[str]:
+    """Paths of blob store images in a complaint's comma separated images, older uploads are skipped."""
+    return [path for path in image_paths(images) if is_blob_path(path)]
+
+
+class BlobStore:
+    """
+    Uploaded images stored once by the sha256 of their bytes, the same photo sent
+    again (mobile retries) maps to the file already on disk whatever its filename,
+    the content type is kept next to the reference count.
+
+    Files are written before the complaint row, references are counted in the
+    complaint's transaction, and the cleanup job removes blobs left without
+    references for longer than IMAGE_BLOB_GRACE_SECONDS.
+    """
+
+    def __init__(self) -> None:
+        # shared by every request of this process, bounds open files and disk writes in flight
+        self._process_slots = asyncio.Semaphore(settings.IMAGE_SAVE_CONCURRENCY_PER_PROCESS)
+        self.stored = 0
+        self.deduplicated = 0
+        self.removed = 0
+
+    # saved concurrently, if one fails the others are cancelled and nothing written by this call is kept
+    async def save_all(self, upload_files: List[UploadFile]) -> List[str]:
+        request_slots = asyncio.Semaphore(settings.IMAGE_SAVE_CONCURRENCY_PER_REQUEST)
+
+        async def save_one(upload_file: UploadFile) -> Tuple[str, Optional[int]]:
+            async with request_slots, self._process_slots:
+                return await self._store(upload_file)
+
+        tasks = [asyncio.create_task(save_one(upload_file)) for upload_file in upload_files]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            failed = next((task for task in tasks if task.done() and not task.cancelled() and task.exception()), None)
+            if failed or any(not task.done() for task in tasks):
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self._discard_created(
+                    task.result() for task in tasks if not task.cancelled() and not task.exception())
+        if failed:
+            raise failed.exception()
+        return [task.result()[0] for task in tasks]
+
+    @staticmethod
+    def _discard_created(stored: Iterable[Tuple[str, Optional[int]]]) -> None:
+        for path, created_mtime in stored:
+            try:
+                # an mtime changed since means another upload deduplicated onto it, it's theirs now
+                if created_mtime is not None and os.stat(path).st_mtime_ns == created_mtime:
+                    os.unlink(path)
+            except FileNotFoundError:
+                continue
+
+    # hashed while streaming to a temporary file, nothing is held in memory,
+    # returns the path and, only when this call created the file, its mtime
+    async def _store(self, upload_file: UploadFile) -> Tuple[str, Optional[int]]:
+        os.makedirs(TEMP_DIRECTORY, exist_ok=True)
+        temp_path = Path(TEMP_DIRECTORY) / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        try:
+            async with aiofiles.open(temp_path, 'wb') as out_file:
+                # Read chunks of 1MB
+                while content := await upload_file.read(1024*1024):
+                    digest.update(content)
+                    await out_file.write(content)
+
+            sha256 = digest.hexdigest()
+            destination = Path(BLOB_DIRECTORY) / sha256[:2] / sha256
+            if destination.exists():
+                # fresh mtime keeps the cleanup job away until the reference is committed
+                os.utime(destination)
+                os.unlink(temp_path)
+                self.deduplicated += 1
+                return str(destination), None
+
+            os.makedirs(destination.parent, exist_ok=True)
+            # atomic, a concurrent upload of the same bytes just replaces it with identical content
+            os.replace(temp_path, destination)
+            self.stored += 1
+            return str(destination), os.stat(destination).st_mtime_ns
+        except BaseException:
+            if temp_path.exists():
+                os.unlink(temp_path)
+            raise
+        finally:
+            await upload_file.close()
+
+    # both run in the caller's transaction, next to the complaint write
+    async def add_references(self, session: AsyncSession, paths: Iterable[str]) -> None:
+        for path, count in Counter(paths).items():
+            statement = insert(ImageBlob).values(
+                path=path,
+                digest=Path(path).stem,
+                content_type=await asyncio.to_thread(self._content_type, path),
+                ref_count=count,
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            await session.execute(statement.on_conflict_do_update(
+                index_elements=[ImageBlob.path],
+                set_={
+                    "ref_count": ImageBlob.ref_count + statement.excluded.ref_count,
+                    "updated_at": statement.excluded.updated_at,
+                }
+            ))
+
+    @staticmethod
+    def _content_type(path: str) -> Optional[str]:
+        try:
+            with open(path, "rb") as blob:
+                return sniff_content_type(blob.read(12))
+        except FileNotFoundError:
+            return None
+
+    async def release(self, session: AsyncSession, paths: Iterable[str]) -> None:
+        for path, count in Counter(paths).items():
+            await session.execute(
+                update(ImageBlob)
+                .where(ImageBlob.path == path)
+                .values(ref_count=ImageBlob.ref_count - count, updated_at=datetime.utcnow())
+            )
+
+    async def cleanup(self, session: AsyncSession) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.IMAGE_BLOB_GRACE_SECONDS)
+        result = await session.execute(
+            delete(ImageBlob)
+            .where(ImageBlob.ref_count <= 0, ImageBlob.updated_at < cutoff)
+            .returning(ImageBlob.path)
+        )
+        unreferenced = [row[0] for row in result]
+        await session.commit()
+
+        # files written by requests that failed before their complaint was saved have no row at all
+        candidates = await asyncio.to_thread(self._stale_files, cutoff)
+        orphans = []
+        for start in range(0, len(candidates), 1000):
+            chunk = candidates[start:start + 1000]
+            known = set((await session.execute(
+                select(ImageBlob.path).where(ImageBlob.path.in_(chunk)))).scalars())
+            orphans.extend(path for path in chunk if path not in known)
+
+        removed = await asyncio.to_thread(self._remove_files, unreferenced + orphans, cutoff)
+        self.removed += removed
+        return removed
+
+    @staticmethod
+    def _stale_files(cutoff: datetime) -> List[str]:
+        cutoff_timestamp = time.time() - (datetime.utcnow() - cutoff).total_seconds()
+        paths = []
+        for directory, _, files in os.walk(BLOB_DIRECTORY):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff_timestamp:
+                        paths.append(path)
+                except FileNotFoundError:
+                    continue
+        return paths
+
+    @staticmethod
+    def _remove_files(paths: List[str], cutoff: datetime) -> int:
+        cutoff_timestamp = time.time() - (datetime.utcnow() - cutoff).total_seconds()
+        removed = 0
+        blob_directory = Path(BLOB_DIRECTORY).resolve()
+        for path in paths:
+            # paths come from the table too, never unlink anything outside the store
+            if not Path(path).resolve().is_relative_to(blob_directory):
+                logger.warning(f"not removing {path}, outside {BLOB_DIRECTORY}")
+                continue
+            try:
+                # uploaded again since the row was deleted, the new upload recreates the row
+                if os.path.getmtime(path) >= cutoff_timestamp:
+                    continue
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+            # variants are named by digest, an older copy with an extension may still use them
+            digest = Path(path).stem
+            if is_blob_path(path) and not any(Path(path).parent.glob(f"{digest}*")):
+                for variant in Path(VARIANT_DIRECTORY).glob(f"{digest}_*"):
+                    variant.unlink(missing_ok=True)
+        return removed
+
+    async def run_cleanup(self, session_factory) -> None:
+        while True:
+            await asyncio.sleep(settings.IMAGE_BLOB_CLEANUP_INTERVAL_SECONDS)
+            try:
+                async with session_factory() as session:
+                    removed = await self.cleanup(session)
+                if removed:
+                    logger.info(f"removed {removed} unreferenced image blobs")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"image blob cleanup failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "removed": self.removed,
+        }
+
+
+blob_store = BlobStore()
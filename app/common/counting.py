@@ -0,0 +1,107 @@
+import json
+import time
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.sql import Select
+
+from app.config import settings
+
+
+class CountStrategy(str, Enum):
+    exact = "exact"
+    cached = "cached"
+    estimate = "estimate"
+    none = "none"
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+# cache key -> (expires at, count), per worker process
+_count_cache: Dict[str, Tuple[float, int]] = {}
+_COUNT_CACHE_MAX_KEYS = 1024
+
+
+def _cache_key(query: Select) -> str:
+    compiled = query.compile()
+    return f"{compiled}|{sorted(compiled.params.items(), key=lambda item: item[0])!r}"
+
+
+async def _exact_count(session: AsyncSession, query: Select) -> int:
+    result = await session.execute(
+        select(func.count()).select_from(query.order_by(None).subquery()))
+    return result.scalar()
+
+
+async def _estimated_count(session: AsyncSession, query: Select, table_name: str) -> int:
+    if query.whereclause is None:
+        # whole table, the planner statistics are enough
+        result = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table_name AS regclass)"),
+            {"table_name": table_name})
+        estimate = result.scalar()
+        # -1 means the table was never vacuumed/analyzed
+        if estimate is not None and estimate >= 0:
+            return estimate
+        return await _exact_count(session, query)
+
+    result = await session.execute(Explain(query.order_by(None)))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(
+        session: AsyncSession,
+        query: Select,
+        table_name: str,
+        strategy: Optional[CountStrategy] = None) -> Optional[int]:
+    """
+    Count the rows matched by `query` with the given strategy.
+    Returns None for CountStrategy.none so callers can skip totals entirely.
+    """
+    strategy = strategy or CountStrategy(settings.COUNT_STRATEGY)
+
+    if strategy == CountStrategy.none:
+        return None
+
+    if strategy == CountStrategy.estimate:
+        return await _estimated_count(session, query, table_name)
+
+    if strategy == CountStrategy.cached:
+        key = _cache_key(query)
+        now = time.monotonic()
+        cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        total = await _exact_count(session, query)
+        if len(_count_cache) >= _COUNT_CACHE_MAX_KEYS:
+            for stale_key in [k for k, (expires, _) in _count_cache.items() if expires <= now]:
+                del _count_cache[stale_key]
+            if len(_count_cache) >= _COUNT_CACHE_MAX_KEYS:
+                _count_cache.clear()
+        _count_cache[key] = (now + settings.COUNT_CACHE_TTL_SECONDS, total)
+        return total
+
+    return await _exact_count(session, query)
+
+
+def total_pages_for(total_items: Optional[int], page_size: int) -> Optional[int]:
+    if total_items is None or page_size <= 0:
+        return None
+    return -(-total_items // page_size)
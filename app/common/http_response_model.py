@@ -5,10 +5,11 @@ from pydantic import BaseModel
 DataT = TypeVar('DataT')
 
 class PageMeta(BaseModel):
-    page: int
+    page: Optional[int]
     page_size: int
-    total_pages: int
-    total_items: int
+    total_pages: Optional[int]
+    total_items: Optional[int]
+    next_cursor: Optional[str]
 
 class CommonResponse(GenericModel, Generic[DataT]):
     message: str
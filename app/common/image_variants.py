@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+from app.common.logger import logger
+from app.config import settings
+
+VARIANT_DIRECTORY = "storage/images/variants"
+
+
+# runs in a worker process, only paths cross the process boundary, the pixels never do
+def render_image_variants(source_path: str, destination: str, thumbnail_size: tuple, widths: List[int], quality: int) -> Dict[str, str]:
+    variants = {}
+    stem = Path(source_path).stem
+    # blobs are named by content hash, a resubmitted photo already has its variants,
+    # the thumbnail is written last so it only exists once the whole set is complete
+    thumbnail_path = Path(destination) / f"{stem}_thumbnail.webp"
+    if thumbnail_path.exists():
+        for width in widths:
+            path = Path(destination) / f"{stem}_{width}.webp"
+            if path.exists():
+                variants[str(width)] = str(path)
+        variants["thumbnail"] = str(thumbnail_path)
+        return variants
+
+    with Image.open(source_path) as opened:
+        # phone photos are stored sideways with an orientation tag
+        image = ImageOps.exif_transpose(opened)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        for width in widths:
+            # never upscale, a small original just gets no larger variants
+            if width >= image.width:
+                continue
+            resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            variants[str(width)] = _save_webp(resized, Path(destination) / f"{stem}_{width}.webp", quality)
+
+        thumbnail = image.copy()
+        thumbnail.thumbnail(thumbnail_size)
+        variants["thumbnail"] = _save_webp(thumbnail, thumbnail_path, quality)
+    return variants
+
+
+# written aside and renamed into place, a concurrent or crashed render never leaves a half written file
+def _save_webp(image: Image.Image, path: Path, quality: int) -> str:
+    temp_path = path.with_name(f"{path.stem}.{uuid.uuid4().hex}.tmp")
+    try:
+        image.save(temp_path, format="webp", quality=quality, method=4)
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            os.unlink(temp_path)
+    return str(path)
+
+
+class ImageVariantWorker:
+    """
+    Pillow work in a process pool, scheduled after the complaint is committed, so
+    neither the request nor the event loop waits on image encoding.
+    """
+
+    def __init__(self) -> None:
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks = set()
+        self.rendered = 0
+        self.failed = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, forking a process that already runs threads and an event loop is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def schedule(self, complaint_id, images: Optional[str]) -> None:
+        if not images:
+            return
+        task = asyncio.create_task(self._process(complaint_id, images))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, complaint_id, images: str) -> None:
+        # imported here, the worker processes import this module and need no database
+        from sqlalchemy import update
+        from app.common.blob_store import blob_paths
+        from app.database import async_session
+        from app.models import Complaint
+
+        os.makedirs(VARIANT_DIRECTORY, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        # only files the blob store wrote ever reach pillow
+        sources = blob_paths(images)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(
+                self.executor,
+                render_image_variants,
+                source,
+                VARIANT_DIRECTORY,
+                (settings.THUMBNAIL_WIDTH, settings.THUMBNAIL_HEIGHT),
+                settings.IMAGE_VARIANT_WIDTHS,
+                settings.IMAGE_WEBP_QUALITY
+            )
+            for source in sources
+        ), return_exceptions=True)
+
+        variants = {}
+        for source, result in zip(sources, results):
+            if isinstance(result, BrokenProcessPool):
+                # a worker died (eg. out of memory on a huge image), start a fresh pool next time
+                self._executor = None
+            if isinstance(result, Exception):
+                self.failed += 1
+                logger.warning(f"image variants failed for {source}: {result}")
+                continue
+            self.rendered += 1
+            variants[source] = result
+
+        try:
+            async with async_session() as session:
+                # only if the images weren't replaced by a later update in the meantime,
+                # derived data, updated_at stays what the complaint's last edit set
+                await session.execute(
+                    update(Complaint)
+                    .where(Complaint.id == complaint_id, Complaint.images == images)
+                    .values(image_variants=variants, updated_at=Complaint.updated_at)
+                )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"storing image variants failed for complaint {complaint_id}: {e}")
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._tasks),
+            "rendered": self.rendered,
+            "failed": self.failed,
+        }
+
+
+image_variant_worker = ImageVariantWorker()
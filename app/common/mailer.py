@@ -0,0 +1,196 @@
+import asyncio
+import smtplib
+import ssl
+from email.message import EmailMessage
+from typing import List, Optional
+
+from app.common.logger import logger
+from app.config import settings
+
+
+class MailQueueFull(Exception):
+    """The mail was not queued, unlike disabled delivery this is a failure the caller has to report."""
+
+
+class OutboundMail:
+    def __init__(self, to: str, subject: str, body: str) -> None:
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.attempts = 0
+
+    def to_message(self) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = settings.MAIL_FROM
+        message["To"] = self.to
+        message["Subject"] = self.subject
+        message.set_content(self.body)
+        return message
+
+
+class SmtpConnection:
+    """One SMTP connection kept open between batches, reconnects when the server dropped it."""
+
+    def __init__(self) -> None:
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        if settings.SMTP_USE_TLS:
+            smtp = smtplib.SMTP_SSL(
+                settings.SMTP_HOST, settings.SMTP_PORT,
+                timeout=settings.SMTP_TIMEOUT_SECONDS, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+            if settings.SMTP_STARTTLS:
+                smtp.starttls(context=ssl.create_default_context())
+        if settings.SMTP_USERNAME:
+            smtp.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        return smtp
+
+    def _ensure_connected(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+        self._smtp = self._connect()
+        return self._smtp
+
+    # blocking, runs in a thread, returns the mails that failed
+    def send_batch(self, batch: List[OutboundMail]) -> List[OutboundMail]:
+        try:
+            smtp = self._ensure_connected()
+        except (smtplib.SMTPException, OSError) as e:
+            logger.warning(f"smtp connection failed: {e}")
+            return batch
+
+        failed = []
+        for index, mail in enumerate(batch):
+            try:
+                smtp.send_message(mail.to_message())
+            except smtplib.SMTPRecipientsRefused as e:
+                # retrying won't help a refused address
+                logger.warning(f"mail to {mail.to} refused: {e}")
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                logger.warning(f"mail to {mail.to} failed, reconnecting: {e}")
+                failed.append(mail)
+                self.close()
+                try:
+                    smtp = self._ensure_connected()
+                except (smtplib.SMTPException, OSError):
+                    return failed + batch[index + 1:]
+            except smtplib.SMTPException as e:
+                logger.warning(f"mail to {mail.to} failed: {e}")
+                failed.append(mail)
+        return failed
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class MailQueue:
+    """
+    In-process outbound mail queue. Requests only enqueue, MAIL_WORKERS background
+    workers drain it in batches of up to MAIL_BATCH_SIZE, each over its own pooled
+    SMTP connection. Failed mails are retried with exponential backoff.
+    Without SMTP_HOST mails are only logged, which is handy for local development.
+    """
+
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.sent = 0
+        self.dropped = 0
+
+    @property
+    def is_enabled(self) -> bool:
+        return bool(settings.SMTP_HOST)
+
+    # False when delivery is disabled, raises MailQueueFull when it is enabled but the mail was dropped
+    def enqueue(self, to: str, subject: str, body: str) -> bool:
+        if not self.is_enabled:
+            logger.info(f"mail delivery disabled, not sending '{subject}' to {to}")
+            return False
+        if not self._put(OutboundMail(to, subject, body)):
+            raise MailQueueFull(f"mail queue is full, '{subject}' to {to} was dropped")
+        return True
+
+    def _put(self, mail: OutboundMail) -> bool:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.MAIL_QUEUE_SIZE)
+        try:
+            self._queue.put_nowait(mail)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"mail queue is full, dropped mail to {mail.to}")
+            return False
+
+    def _retry_later(self, mail: OutboundMail) -> None:
+        mail.attempts += 1
+        if mail.attempts >= settings.MAIL_MAX_ATTEMPTS:
+            self.dropped += 1
+            logger.error(f"giving up on mail to {mail.to} after {mail.attempts} attempts")
+            return
+        delay = settings.MAIL_RETRY_BASE_SECONDS * 2 ** (mail.attempts - 1)
+        asyncio.get_running_loop().call_later(delay, self._put, mail)
+
+    async def _next_batch(self) -> List[OutboundMail]:
+        batch = [await self._queue.get()]
+        while len(batch) < settings.MAIL_BATCH_SIZE and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _worker(self) -> None:
+        connection = SmtpConnection()
+        try:
+            while True:
+                batch = await self._next_batch()
+                try:
+                    failed = await asyncio.to_thread(connection.send_batch, batch)
+                except Exception as e:
+                    logger.error(f"mail batch failed: {e}")
+                    failed = batch
+                self.sent += len(batch) - len(failed)
+                for mail in failed:
+                    self._retry_later(mail)
+                for _ in batch:
+                    self._queue.task_done()
+        finally:
+            await asyncio.to_thread(connection.close)
+
+    def start(self) -> None:
+        if not self.is_enabled or self._workers:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.MAIL_QUEUE_SIZE)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(settings.MAIL_WORKERS)]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        # give queued mails a moment to go out before shutting down
+        if self._queue is not None and self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self._queue.qsize()} queued mails not sent at shutdown")
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.is_enabled,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+
+mail_queue = MailQueue()
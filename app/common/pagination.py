@@ -0,0 +1,82 @@
+import base64
+import json
+import uuid as uuid_pkg
+from datetime import datetime
+from enum import Enum
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.sql import Select
+
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+
+# cursors are opaque to clients, internally they are the sort key, the order and the (sort value, id) pair of the last row
+def encode_cursor(
+        value: datetime,
+        id: uuid_pkg.UUID,
+        sort_key: str = "updated_at",
+        order: SortOrder = SortOrder.desc) -> str:
+    raw = json.dumps([sort_key, SortOrder(order).value, value.isoformat(), str(id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+        cursor: str,
+        sort_key: str = "updated_at",
+        order: SortOrder = SortOrder.desc) -> Tuple[datetime, uuid_pkg.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort_key, cursor_order, value, id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value, id = datetime.fromisoformat(value), uuid_pkg.UUID(id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if cursor_sort_key != sort_key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor was issued for a different sort key")
+    # seeking the other way from the last row would silently skip or repeat rows
+    if cursor_order != SortOrder(order).value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor was issued for a different sort order")
+    return value, id
+
+
+def next_cursor_for(
+        rows: list,
+        page_size: int,
+        sort_key: str = "updated_at",
+        order: SortOrder = SortOrder.desc) -> Optional[str]:
+    # a short page means there is nothing after it
+    if not rows or len(rows) < page_size:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, sort_key), last.id, sort_key, order)
+
+
+def order_and_seek(
+        query: Select,
+        sort_column,
+        id_column,
+        order: SortOrder = SortOrder.desc,
+        cursor: Optional[str] = None) -> Select:
+    """
+    Orders by (sort_column, id_column) which is a stable total order, and with a
+    cursor seeks past the last row seen instead of counting rows to skip.
+    """
+    if order == SortOrder.asc:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    else:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_column.key, order)
+        row, seek = tuple_(sort_column, id_column), tuple_(value, last_id)
+        query = query.where(row > seek if order == SortOrder.asc else row < seek)
+
+    return query
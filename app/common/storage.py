@@ -0,0 +1,168 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from fastapi import UploadFile
+
+from app.config import settings
+
+# returned by s3 when an If-None-Match: * write finds the key already there,
+# or when a concurrent conditional write to the same key is still in progress
+EXISTS_ERROR_CODES = {"PreconditionFailed", "ConditionalRequestConflict"}
+
+
+class ObjectStorage:
+    """
+    One s3 client per process. boto3 clients are thread safe, so every call runs
+    in a thread pool as large as the client's connection pool and the event loop
+    never waits on the network.
+    """
+
+    def __init__(self) -> None:
+        self.bucket_name = settings.AWS_S3_BUCKET_NAME
+        self._client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.requests = 0
+        self.existing = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client(
+                "s3",
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_DEFAULT_REGION,
+                # empty in a .env copied from the example means aws itself
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL or None,
+                config=Config(
+                    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                    connect_timeout=settings.S3_CONNECT_TIMEOUT_SECONDS,
+                    read_timeout=settings.S3_READ_TIMEOUT_SECONDS,
+                    tcp_keepalive=True,
+                    retries={"max_attempts": settings.S3_MAX_ATTEMPTS, "mode": "adaptive"},
+                ),
+            )
+        return self._client
+
+    async def _call(self, method: str, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.S3_MAX_POOL_CONNECTIONS, thread_name_prefix="object-storage")
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(getattr(self.client, method), **kwargs))
+
+    def object_url(self, key: str) -> str:
+        if settings.AWS_S3_ENDPOINT_URL:
+            return f"{settings.AWS_S3_ENDPOINT_URL.rstrip('/')}/{self.bucket_name}/{key}"
+        return f"https://{self.bucket_name}.s3.amazonaws.com/{key}"
+
+    async def put(self, key: str, body: bytes, content_type: str) -> str:
+        await self._call("put_object", Bucket=self.bucket_name, Key=key, Body=body, ContentType=content_type)
+        return self.object_url(key)
+
+    # exists-or-create in one request, s3 rejects the write when the key is taken
+    async def put_if_absent(self, key: str, body: bytes, content_type: str) -> Tuple[str, bool]:
+        try:
+            await self._call(
+                "put_object",
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
+                IfNoneMatch="*"
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in EXISTS_ERROR_CODES:
+                raise
+            self.existing += 1
+            return self.object_url(key), False
+        return self.object_url(key), True
+
+    async def get(self, key: str) -> bytes:
+        response = await self._call("get_object", Bucket=self.bucket_name, Key=key)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, response["Body"].read)
+
+    async def delete(self, key: str) -> None:
+        await self._call("delete_object", Bucket=self.bucket_name, Key=key)
+
+    # reads the upload one part at a time, so memory stays around (concurrency + 1) * part size
+    # whatever the file size
+    async def stream_upload(self, upload_file: UploadFile, key: str, content_type: str) -> str:
+        part_size = settings.S3_MULTIPART_PART_SIZE
+        await upload_file.seek(0)
+        chunk = await upload_file.read(part_size)
+
+        # a single part, a plain put is one request instead of three
+        if len(chunk) < part_size:
+            return await self.put(key, chunk, content_type)
+
+        multipart = await self._call(
+            "create_multipart_upload", Bucket=self.bucket_name, Key=key, ContentType=content_type)
+        upload_id = multipart["UploadId"]
+        slots = asyncio.Semaphore(settings.S3_MULTIPART_CONCURRENCY)
+        tasks = []
+
+        async def send_part(part_number: int, body: bytes) -> dict:
+            try:
+                part = await self._call(
+                    "upload_part",
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body
+                )
+                return {"PartNumber": part_number, "ETag": part["ETag"]}
+            finally:
+                slots.release()
+
+        try:
+            part_number = 1
+            while chunk:
+                await slots.acquire()
+                # stop reading as soon as one part failed
+                for task in tasks:
+                    if task.done() and task.exception():
+                        raise task.exception()
+                tasks.append(asyncio.create_task(send_part(part_number, chunk)))
+                part_number += 1
+                chunk = await upload_file.read(part_size)
+
+            parts = await asyncio.gather(*tasks)
+            await self._call(
+                "complete_multipart_upload",
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # otherwise the uploaded parts stay billed until a lifecycle rule removes them
+            await self._call(
+                "abort_multipart_upload", Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+            raise
+        return self.object_url(key)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "configured": bool(self.bucket_name),
+            "requests": self.requests,
+            "existing": self.existing,
+        }
+
+
+object_storage = ObjectStorage()
@@ -3,7 +3,8 @@ import io
 import re
 
 
-async def resize_image(
+# cpu bound, call it from a worker process (see image_variants.py), never on the event loop
+def resize_image(
     file_content: bytes,
     file_name: str,
     file_content_type: str,
@@ -1,3 +1,5 @@
+from typing import Dict, List, Optional
+
 from pydantic import BaseSettings
 
 
@@ -7,6 +9,7 @@ class Settings(BaseSettings):
     HOST: str = "localhost"
     PORT: int = 8900
     RELOAD: bool = True
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
     DATABASE_HOST: str
     DATABASE_PORT: int
     DATABASE_NAME: str
@@ -14,14 +17,87 @@ class Settings(BaseSettings):
     DATABASE_PASSWORD: str
     API_PREFIX: str
     DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_POOL_MAX_OVERFLOW: int = 5
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: int = 10
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_REPLICA_URLS: List[str] = []
+    DB_REPLICA_HEALTH_INTERVAL_SECONDS: float = 5.0
+    DB_CREATE_SCHEMA_ON_STARTUP: bool = False
+    READINESS_TIMEOUT_SECONDS: float = 2.0
+    COUNT_STRATEGY: str = "exact"
+    CURSOR_COUNT_STRATEGY: str = "none"
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    SMTP_HOST: Optional[str] = None
+    SMTP_PORT: int = 25
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = False
+    SMTP_USE_TLS: bool = False
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    MAIL_FROM: str = "no-reply@localhost"
+    MAIL_LINK_BASE_URL: str = ""
+    MAIL_RESET_PASSWORD_URL: str = ""
+    MAIL_RETURN_RESET_LINK: bool = False
+    MAIL_WORKERS: int = 2
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_QUEUE_SIZE: int = 10000
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BASE_SECONDS: float = 2.0
+    BULK_BATCH_SIZE: int = 1000
+    BULK_MAX_ROWS: int = 100000
+    BULK_MAX_BYTES: int = 100 * 1024 * 1024
+    BULK_MAX_LINE_BYTES: int = 64 * 1024
+    AWS_ACCESS_KEY_ID: Optional[str] = None
+    AWS_SECRET_ACCESS_KEY: Optional[str] = None
+    AWS_DEFAULT_REGION: Optional[str] = None
+    AWS_S3_BUCKET_NAME: Optional[str] = None
+    AWS_S3_ENDPOINT_URL: Optional[str] = None
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_CONNECT_TIMEOUT_SECONDS: float = 5
+    S3_READ_TIMEOUT_SECONDS: float = 30
+    S3_MAX_ATTEMPTS: int = 3
+    S3_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY: int = 4
     THUMBNAIL_WIDTH: int = 500
     THUMBNAIL_HEIGHT: int = 500
+    IMAGE_WORKERS: int = 2
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1280]
+    IMAGE_WEBP_QUALITY: int = 80
+    IMAGE_SAVE_CONCURRENCY_PER_REQUEST: int = 4
+    IMAGE_SAVE_CONCURRENCY_PER_PROCESS: int = 32
+    IMAGE_BLOB_CLEANUP_INTERVAL_SECONDS: float = 3600
+    IMAGE_BLOB_GRACE_SECONDS: int = 3600
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
+    # JWT_SECRET_KEY is published under JWT_KEY_ID, retired keys stay valid for verification until removed
+    JWT_KEY_ID: str = "default"
+    JWT_PREVIOUS_KEYS: Dict[str, str] = {}
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int
     JWT_REFRESH_TOKEN_EXPIRE_MINUTES: int
     EMAIL_TOKEN_SALT: str
     EMAIL_EXPIRE_SECONDS: int = 600
+    ACTIVATION_EXPIRE_SECONDS: int = 259200
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_ROUNDS: Optional[int] = None
+    PASSWORD_HASH_TARGET_MS: float = 250
+    AUTH_MIDDLEWARE_ENABLED: bool = True
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_THROTTLE_IP_BURST: int = 20
+    LOGIN_THROTTLE_IP_PER_MINUTE: float = 30
+    LOGIN_THROTTLE_EMAIL_BURST: int = 5
+    LOGIN_THROTTLE_EMAIL_PER_MINUTE: float = 5
+    LOGIN_THROTTLE_REDIS_URL: Optional[str] = None
+    REVOCATION_REFRESH_SECONDS: float = 5.0
+    REVOCATION_REFRESH_OVERLAP_SECONDS: float = 60.0
+    REVOCATION_FULL_RELOAD_SECONDS: float = 300.0
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    TOKEN_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_REDIS_URL: Optional[str] = None
 
     @property
     def DB_URL(self) -> str:
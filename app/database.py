@@ -1,17 +1,155 @@
-from typing import AsyncGenerator
+import asyncio
+import itertools
+from typing import AsyncGenerator, List, Optional
 
 from app.config import settings
-from sqlalchemy.ext.asyncio import create_async_engine
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import Delete, Insert, Update
+from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-async_engine = create_async_engine(settings.DB_URL, echo=settings.DB_ECHO, future=True)
+from app.common.logger import logger
 
-async def db_session() -> AsyncGenerator:
-    async_session = sessionmaker(
-        bind=async_engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
+
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        future=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
     )
+
+
+async_engine = _create_engine(settings.DB_URL)
+
+
+class ReplicaSet:
+    """
+    Read replicas of the primary, handed out round robin.
+    A replica that fails its health check is skipped until it passes again.
+    """
+
+    def __init__(self, urls: List[str]) -> None:
+        self.engines = [_create_engine(url) for url in urls]
+        self._healthy = set(range(len(self.engines)))
+        self._order = itertools.cycle(range(len(self.engines)))
+
+    def pick(self) -> Optional[AsyncEngine]:
+        for _ in range(len(self.engines)):
+            index = next(self._order)
+            if index in self._healthy:
+                return self.engines[index]
+        return None
+
+    async def _ping(self, index: int) -> None:
+        try:
+            async with self.engines[index].connect() as conn:
+                await asyncio.wait_for(
+                    conn.execute(text("SELECT 1")), timeout=settings.READINESS_TIMEOUT_SECONDS)
+            if index not in self._healthy:
+                logger.info(f"database replica {index} is healthy again")
+            self._healthy.add(index)
+        except Exception as e:
+            if index in self._healthy:
+                logger.warning(f"database replica {index} failed health check: {e}")
+            self._healthy.discard(index)
+
+    async def check_health(self) -> None:
+        await asyncio.gather(*(self._ping(index) for index in range(len(self.engines))))
+
+    async def run_health_checks(self) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_INTERVAL_SECONDS)
+
+    def status(self) -> dict:
+        return {
+            "replicas": len(self.engines),
+            "healthy": len(self._healthy),
+        }
+
+
+replicas = ReplicaSet(settings.DB_REPLICA_URLS)
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to the replica chosen for the request and everything else to the primary.
+    Once the request has written anything it sticks to the primary, so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        request_state = self.info.get("request_state")
+        replica = self.info.get("replica_engine")
+        is_write = self._flushing or isinstance(clause, (Insert, Update, Delete))
+
+        if is_write and request_state is not None:
+            request_state.db_wrote = True
+        if replica is None or is_write or getattr(request_state, "db_wrote", False):
+            return async_engine.sync_engine
+        return replica.sync_engine
+
+
+class RoutingAsyncSession(AsyncSession):
+    sync_session_class = RoutingSession
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_request_wrote(session, flush_context):
+    request_state = session.info.get("request_state")
+    if request_state is not None:
+        request_state.db_wrote = True
+
+
+# one session factory for the whole process, sessions are cheap but the factory is not
+async_session = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+read_session = sessionmaker(
+    class_=RoutingAsyncSession,
+    expire_on_commit=False,
+)
+
+
+async def db_session(request: Request) -> AsyncGenerator:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        session.info["request_state"] = request.state
+        yield session
+
+
+# for read only service methods, falls back to the primary without healthy replicas
+async def db_read_session(request: Request) -> AsyncGenerator:
+    async with read_session() as session:
+        session.info["request_state"] = request.state
+        session.info["replica_engine"] = replicas.pick()
+        yield session
+
+
+def get_pool_status() -> dict:
+    """
+    Live connection pool counters of this worker process.
+    `max_connections` is the worst case for the whole server, ie. every
+    worker (WORKERS_COUNT) holding its full pool plus overflow.
+    """
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "workers": settings.WORKERS_COUNT,
+        "max_connections": settings.WORKERS_COUNT * (settings.DB_POOL_SIZE + settings.DB_POOL_MAX_OVERFLOW),
+        **replicas.status(),
+    }
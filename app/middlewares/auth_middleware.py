@@ -1,31 +1,106 @@
-from fastapi import FastAPI, Request, HTTPException, Depends
-import jwt
-from jwt import ExpiredSignatureError, PyJWTError
-from starlette.middleware.base import BaseHTTPMiddleware
+import re
+from typing import Iterable, Optional
+
+import ujson
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.auth.token_handler import JWTTokenHandler
+from app.common.http_response_model import CommonResponse
 from app.config import settings
 
+API = re.escape(settings.API_PREFIX)
+
+# routes that work without a token, everything else needs a valid bearer token
+DEFAULT_UNPROTECTED_PREFIXES = [
+    # the probes only, /health/metrics shows internals and needs a token
+    f"{settings.API_PREFIX}/health/live",
+    f"{settings.API_PREFIX}/health/ready",
+    f"{settings.API_PREFIX}/health-check",
+    "/docs/oauth2-redirect",
+    f"{settings.API_PREFIX}/docs",
+    f"{settings.API_PREFIX}/redoc",
+    f"{settings.API_PREFIX}/openapi.json",
+    f"{settings.API_PREFIX}/auth/register",
+    f"{settings.API_PREFIX}/auth/login",
+    f"{settings.API_PREFIX}/auth/token/refresh",
+    f"{settings.API_PREFIX}/auth/reset-password",
+    f"{settings.API_PREFIX}/auth/reset-password-email",
+    f"{settings.API_PREFIX}/auth/activate",
+]
+DEFAULT_UNPROTECTED_PATTERNS = [
+    # complaints are public, except the ones of the current user
+    rf"{API}/complaint(?!/mine(?:/|$))(?:/.*)?",
+]
+
+
+class AuthMiddleware:
+    """
+    Pure ASGI authentication middleware.
+
+    The unprotected routes are compiled into a single regex once, when the app is built.
+    Valid tokens are decoded once and their claims are put on `scope["state"]["token_claims"]`,
+    where AuthHandler picks them up instead of decoding the token again. A token sent to an
+    unprotected route is decoded too but never causes a rejection there.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            unprotected_prefixes: Optional[Iterable[str]] = None,
+            unprotected_patterns: Optional[Iterable[str]] = None,
+            token_handler: Optional[JWTTokenHandler] = None) -> None:
+        self.app = app
+        self.token_handler = token_handler or JWTTokenHandler()
+
+        prefixes = DEFAULT_UNPROTECTED_PREFIXES if unprotected_prefixes is None else unprotected_prefixes
+        patterns = DEFAULT_UNPROTECTED_PATTERNS if unprotected_patterns is None else unprotected_patterns
+        rules = [re.escape(prefix) + r"(?:/.*)?" for prefix in prefixes] + list(patterns)
+        self.unprotected = re.compile("|".join(f"(?:{rule})" for rule in rules) or r"(?!)")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        is_protected = self.unprotected.fullmatch(scope["path"]) is None
+        token = self._bearer_token(scope)
+
+        if token is None:
+            if is_protected:
+                await self._reject(send, "Not authenticated")
+                return
+            await self.app(scope, receive, send)
+            return
+
+        claims = self.token_handler.decode_jwt(token)
+        if claims.get("sub"):
+            scope.setdefault("state", {})["token_claims"] = claims
+        elif is_protected:
+            await self._reject(send, "Invalid token or expired token.")
+            return
+
+        await self.app(scope, receive, send)
 
+    @staticmethod
+    def _bearer_token(scope: Scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme == "Bearer" and token:
+                    return token
+                return None
+        return None
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    
-    unprotected_paths = ["/api/v1/", "/api/v1/token", "/api/v1/docs/", "/api/v1/openapi.json"]
-
-    async def dispatch(self, request: Request, call_next):
-        print(request.url.path)
-        # return await call_next(request)
-        if request.url.path in self.unprotected_paths:
-            return await call_next(request)
-        
-        token = request.headers.get("Authorization")
-        if token and token.startswith("Bearer "):
-            token = token.split("Bearer ")[1]
-            try:
-                jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-            except ExpiredSignatureError:
-                raise HTTPException(status_code=401, detail="Token has expired")
-            except PyJWTError:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            
-            return await call_next(request)
-        else:
-            raise HTTPException(status_code=401, detail="Not authenticated")
\ No newline at end of file
+    @staticmethod
+    async def _reject(send: Send, message: str) -> None:
+        body = ujson.dumps(CommonResponse(success=False, message=message, payload=None).dict()).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 401,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"www-authenticate", b"Bearer"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
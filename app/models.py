@@ -1,6 +1,8 @@
 import uuid as uuid_pkg
+from typing import Optional
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import Column, Computed, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlmodel import Field, SQLModel
 
 
@@ -8,10 +10,8 @@ class UUIDModel(SQLModel):
     id: uuid_pkg.UUID = Field(
         default_factory=uuid_pkg.uuid4,
         primary_key=True,
-        index=True,
         nullable=False,
-        sa_column_kwargs={"server_default": text(
-            "gen_random_uuid()"), "unique": True},
+        sa_column_kwargs={"server_default": text("gen_random_uuid()")},
     )
 
 
@@ -34,6 +34,9 @@ class TimestampModel(SQLModel):
 
 class User(UUIDModel, TimestampModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_provider_provider_id", "provider", "provider_id", unique=True),
+    )
 
     name: str = Field(nullable=False)
     email: str = Field(nullable=False, index=True, unique=True)
@@ -43,6 +46,8 @@ class User(UUIDModel, TimestampModel, table=True):
     role = Field(nullable=False, default="user", index=True)
     is_admin: bool = Field(default=False)
     is_active: bool = Field(default=False)
+    provider: str = Field(nullable=True)
+    provider_id: str = Field(nullable=True)
 
     def dict(self, **kwargs):
         user_dict = super().dict(**kwargs)
@@ -52,6 +57,16 @@ class User(UUIDModel, TimestampModel, table=True):
 
 class Complaint(UUIDModel, TimestampModel, table=True):
     __tablename__ = "complaints"
+    # every listing is ordered by (updated_at, id), so each access path ends with that pair
+    __table_args__ = (
+        Index("ix_complaints_updated_at_id", "updated_at", "id"),
+        Index("ix_complaints_created_at_id", "created_at", "id"),
+        # covers the "my complaints" summary so its first page is an index only scan
+        Index("ix_complaints_user_id_updated_at_id_covering", "user_id", "updated_at", "id",
+              postgresql_include=["status", "category", "place", "created_at"]),
+        Index("ix_complaints_status_updated_at_id", "status", "updated_at", "id"),
+        Index("ix_complaints_category_updated_at_id", "category", "updated_at", "id"),
+    )
 
     description: str = Field(nullable=False)
     category: str = Field(nullable=False)
@@ -60,6 +75,58 @@ class Complaint(UUIDModel, TimestampModel, table=True):
     user_id: uuid_pkg.UUID = Field(nullable=False)
     status: str = Field(nullable=False, default="pending")
     note: str = Field(nullable=True)
+    # original image path -> {"thumbnail": path, "<width>": path}, filled in the background, see image_variants.py
+    image_variants: Optional[dict] = Field(default=None, sa_column=Column(JSONB, nullable=True))
+
+
+# an uploaded image stored once by content hash, ref_count is the number of complaint image
+# references to it, see app/common/blob_store.py
+class ImageBlob(SQLModel, table=True):
+    __tablename__ = "image_blobs"
+    __table_args__ = (
+        # only unreferenced blobs, the cleanup job never scans the rest
+        Index("ix_image_blobs_unreferenced_updated_at", "updated_at",
+              postgresql_where=text("ref_count <= 0")),
+    )
+
+    path: str = Field(primary_key=True, nullable=False)
+    digest: str = Field(nullable=False, index=True)
+    # sniffed from the bytes, the path carries no extension, null for blobs stored before it was recorded
+    content_type: Optional[str] = Field(default=None, nullable=True)
+    ref_count: int = Field(nullable=False, default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+# a single access or refresh token revoked before its expiry, see app/auth/revocation.py
+class RevokedToken(SQLModel, table=True):
+    __tablename__ = "revoked_tokens"
+
+    jti: str = Field(primary_key=True, nullable=False)
+    subject: str = Field(nullable=True)
+    expires_at: datetime = Field(nullable=False, index=True)
+    revoked_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, index=True)
+
+
+# every token of the subject issued before revoked_at is revoked
+class UserTokenRevocation(SQLModel, table=True):
+    __tablename__ = "user_token_revocations"
+
+    subject: str = Field(primary_key=True, nullable=False)
+    revoked_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, index=True)
+
 
+# Full text search document of a complaint, generated by postgres so it can never go stale.
+# It lives on the table but is not mapped, so it is never loaded or serialized with a complaint.
+COMPLAINT_SEARCH_CONFIG = "english"
+COMPLAINT_SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{COMPLAINT_SEARCH_CONFIG}', coalesce(description, '')), 'A') || "
+    f"setweight(to_tsvector('{COMPLAINT_SEARCH_CONFIG}', coalesce(place, '')), 'B') || "
+    f"setweight(to_tsvector('{COMPLAINT_SEARCH_CONFIG}', coalesce(note, '')), 'C')"
+)
+Complaint.__table__.append_column(
+    Column("search_vector", TSVECTOR, Computed(COMPLAINT_SEARCH_VECTOR_SQL, persisted=True)))
+Index("ix_complaints_search_vector",
+      Complaint.__table__.c.search_vector, postgresql_using="gin")
 
 metadata = SQLModel.metadata
@@ -1,7 +1,11 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
+from enum import Enum
 import uuid as uuid_pkg
 
+from app.common.pagination import SortOrder
+
 
 class CreateComplaint(BaseModel):
     description: str
@@ -18,6 +22,36 @@ class UpdateComplaint(BaseModel):
     images: Optional[str]
 
 
+class ComplaintSort(str, Enum):
+    updated_at = "updated_at"
+    created_at = "created_at"
+
+
+class ComplaintFilter(BaseModel):
+    status: Optional[str]
+    category: Optional[str]
+    user_id: Optional[uuid_pkg.UUID]
+    created_from: Optional[datetime]
+    created_to: Optional[datetime]
+    updated_from: Optional[datetime]
+    updated_to: Optional[datetime]
+    sort: ComplaintSort = ComplaintSort.updated_at
+    order: SortOrder = SortOrder.desc
+
+
+# only columns of the covering per user index, see Complaint.__table_args__
+class ComplaintSummary(BaseModel):
+    id: uuid_pkg.UUID
+    status: str
+    category: str
+    place: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
 class CreateUser(BaseModel):
     name: str
     email: str
@@ -28,6 +62,10 @@ class RefreshToken(BaseModel):
     refresh_token: str
 
 
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str]
+
+
 class LoginUser(BaseModel):
     email: str
     password: str
@@ -46,6 +84,10 @@ class PasswordResetRequest(BaseModel):
     new_password: str
 
 
+class ActivateUserRequest(BaseModel):
+    token: str
+
+
 class PasswordResetRequestRequest(BaseModel):
     email: str
 
@@ -0,0 +1,118 @@
+"""
+Prints the Postgres query plans of the complaint list queries before and after
+the complaint access path indexes (migrations 8c4e2a91f5b3, d27a6f3e9b40 and a61c0e4d8f27).
+
+Everything runs in a scratch schema which is dropped at the end, the real
+complaints table is not touched.
+
+    python -m benchmarks.complaint_query_plans --rows 500000
+"""
+import argparse
+import time
+
+import psycopg2
+
+from app.config import settings
+
+SCHEMA = "bench_complaint_plans"
+
+QUERIES = {
+    "list, first page": """
+        SELECT * FROM complaints
+        ORDER BY updated_at DESC, id DESC LIMIT 100""",
+    "list, offset page 2000": """
+        SELECT * FROM complaints
+        ORDER BY updated_at DESC, id DESC OFFSET 199900 LIMIT 100""",
+    "list, keyset page": """
+        SELECT * FROM complaints
+        WHERE (updated_at, id) < (now() - interval '200 days', 'ffffffff-ffff-ffff-ffff-ffffffffffff')
+        ORDER BY updated_at DESC, id DESC LIMIT 100""",
+    "per user": """
+        SELECT * FROM complaints WHERE user_id = (SELECT user_id FROM complaints LIMIT 1)
+        ORDER BY updated_at DESC, id DESC LIMIT 100""",
+    "my complaints, summary columns": """
+        SELECT id, status, category, place, created_at, updated_at FROM complaints
+        WHERE user_id = (SELECT user_id FROM complaints LIMIT 1)
+        ORDER BY updated_at DESC, id DESC LIMIT 20""",
+    "status filter": """
+        SELECT * FROM complaints WHERE status = 'resolved'
+        ORDER BY updated_at DESC, id DESC LIMIT 100""",
+}
+
+INDEXES = [
+    "CREATE INDEX ix_complaints_updated_at_id ON complaints (updated_at, id)",
+    "CREATE INDEX ix_complaints_created_at_id ON complaints (created_at, id)",
+    "CREATE INDEX ix_complaints_user_id_updated_at_id_covering ON complaints (user_id, updated_at, id)"
+    " INCLUDE (status, category, place, created_at)",
+    "CREATE INDEX ix_complaints_status_updated_at_id ON complaints (status, updated_at, id)",
+    "CREATE INDEX ix_complaints_category_updated_at_id ON complaints (category, updated_at, id)",
+]
+
+
+def seed(cursor, rows: int, users: int) -> None:
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    cursor.execute("""
+        CREATE TABLE complaints (
+            id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            created_at timestamp NOT NULL,
+            updated_at timestamp NOT NULL,
+            description varchar NOT NULL,
+            category varchar NOT NULL,
+            place varchar,
+            images varchar,
+            user_id uuid NOT NULL,
+            status varchar NOT NULL,
+            note varchar
+        )""")
+    cursor.execute("""
+        INSERT INTO complaints (created_at, updated_at, description, category, place, user_id, status)
+        SELECT ts, ts + (random() * interval '5 days'),
+               'complaint ' || n,
+               (ARRAY['fire', 'logging', 'poaching', 'waste'])[1 + n %% 4],
+               'place ' || n %% 1000,
+               md5((n %% %s)::text)::uuid,
+               (ARRAY['pending', 'in-progress', 'resolved'])[1 + n %% 3]
+        FROM (
+            SELECT n, now() - (n * interval '1 minute') AS ts FROM generate_series(1, %s) AS n
+        ) AS seeded""", (users, rows))
+    cursor.execute("VACUUM ANALYZE complaints")
+
+
+def explain_all(cursor, title: str) -> None:
+    print(f"\n######## {title} ########")
+    for name, query in QUERIES.items():
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) {query}")
+        print(f"\n--- {name}")
+        for (line,) in cursor.fetchall():
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(settings.DB_SYNC_URL)
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        start = time.perf_counter()
+        seed(cursor, args.rows, args.users)
+        print(f"seeded {args.rows} complaints in {time.perf_counter() - start:.1f}s")
+
+        explain_all(cursor, "before: primary key only")
+        for statement in INDEXES:
+            cursor.execute(statement)
+        # index only scans need the visibility map
+        cursor.execute("VACUUM ANALYZE complaints")
+        explain_all(cursor, "after: access path indexes")
+    finally:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
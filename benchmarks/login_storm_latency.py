@@ -0,0 +1,75 @@
+"""
+Latency of an unrelated request while a burst of logins verifies bcrypt hashes,
+with the blocking AuthHandler.verify_password and with verify_password_async.
+
+The unrelated request is a handler that does no work, so its latency is how
+long the event loop kept it waiting. No database is needed.
+
+    python -m benchmarks.login_storm_latency --logins 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.auth.auth_handler import AuthHandler
+
+auth_handler = AuthHandler()
+PASSWORD = b"correct horse battery staple"
+
+
+async def login_sync(hashed_password: str) -> None:
+    auth_handler.verify_password(PASSWORD, hashed_password)
+
+
+async def login_async(hashed_password: str) -> None:
+    await auth_handler.verify_password_async(PASSWORD, hashed_password)
+
+
+async def unrelated_route() -> None:
+    await asyncio.sleep(0)
+
+
+async def measure(login, hashed_password: str, logins: int, interval: float) -> list:
+    latencies = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.create_task(unrelated_route())
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(interval)
+
+    async def storm():
+        await asyncio.gather(*(login(hashed_password) for _ in range(logins)))
+        done.set()
+
+    await asyncio.gather(probe(), storm())
+    return latencies
+
+
+def report(name: str, latencies: list, elapsed: float) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:<28} storm {elapsed:6.2f}s  probes {len(ordered):5d}  "
+          f"p50 {statistics.median(ordered):8.2f}ms  p99 {p99:8.2f}ms  max {ordered[-1]:8.2f}ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--probe-interval-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    hashed_password = auth_handler.hash_password(PASSWORD.decode("utf-8")).decode("utf-8")
+    interval = args.probe_interval_ms / 1000
+
+    for name, login in (("verify_password", login_sync), ("verify_password_async", login_async)):
+        start = time.perf_counter()
+        latencies = await measure(login, hashed_password, args.logins, interval)
+        report(name, latencies, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Small object uploads per second from one worker process: a new boto3 client per
+upload with head_object before put_object, as S3FileClient used to do, against
+the shared ObjectStorage with conditional put_if_absent calls in flight at once.
+
+Runs against AWS_S3_ENDPOINT_URL / AWS_S3_BUCKET_NAME from .env, use a moto
+server or minio rather than a real bucket.
+
+    python -m benchmarks.storage_upload_throughput --uploads 500 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import boto3
+
+from app.common.storage import object_storage
+from app.config import settings
+
+BODY = os.urandom(32 * 1024)
+
+
+def legacy_upload(key: str) -> None:
+    client = boto3.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_DEFAULT_REGION,
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL
+    )
+    try:
+        client.head_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=key)
+    except:
+        client.put_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=key, Body=BODY, ContentType="image/jpeg")
+
+
+async def legacy(uploads: int, prefix: str) -> None:
+    # the old client was synchronous, every upload blocked the loop in turn
+    for i in range(uploads):
+        legacy_upload(f"{prefix}/{i}.jpg")
+
+
+async def shared(uploads: int, concurrency: int, prefix: str) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def upload(i: int) -> None:
+        async with slots:
+            await object_storage.put_if_absent(f"{prefix}/{i}.jpg", BODY, "image/jpeg")
+
+    await asyncio.gather(*(upload(i) for i in range(uploads)))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    prefix = f"benchmark-{uuid.uuid4().hex[:8]}"
+
+    for name, run in (
+        ("client per upload + head", lambda: legacy(args.uploads, f"{prefix}/legacy")),
+        ("shared client, new keys", lambda: shared(args.uploads, args.concurrency, f"{prefix}/shared")),
+        ("shared client, existing", lambda: shared(args.uploads, args.concurrency, f"{prefix}/shared")),
+    ):
+        start = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<26} {args.uploads / elapsed:8.1f} uploads/s  {elapsed:6.2f}s")
+
+    object_storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
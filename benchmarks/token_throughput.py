@@ -0,0 +1,90 @@
+"""
+Issue and verify throughput on one core for access, refresh and reset password
+tokens, with the reused JWTTokenHandler keys and serializers and, for comparison,
+the previous way of re-reading settings and building a serializer on every call.
+
+Verification is the signature and exp check only, without the verified token
+cache or the revocation store. No database is needed.
+
+    python -m benchmarks.token_throughput --seconds 2
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import jwt
+from itsdangerous import URLSafeTimedSerializer
+
+from app.auth.token_handler import JWTTokenHandler
+from app.config import settings
+
+token_handler = JWTTokenHandler()
+CLAIMS = {"sub": "user@example.com"}
+EMAIL = "user@example.com"
+
+
+def legacy_issue(minutes: int) -> str:
+    to_encode = CLAIMS.copy()
+    to_encode.update({"exp": datetime.utcnow() + timedelta(minutes=minutes),
+                      "iat": datetime.utcnow(), "jti": uuid.uuid4().hex})
+    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def legacy_verify(token: str) -> dict:
+    return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+
+
+def legacy_reset_issue() -> str:
+    return URLSafeTimedSerializer(settings.JWT_SECRET_KEY).dumps(EMAIL, salt=settings.EMAIL_TOKEN_SALT)
+
+
+def legacy_reset_verify(token: str) -> str:
+    return URLSafeTimedSerializer(settings.JWT_SECRET_KEY).loads(
+        token, salt=settings.EMAIL_TOKEN_SALT, max_age=settings.EMAIL_EXPIRE_SECONDS)
+
+
+def ops_per_second(fn, seconds: float) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn()
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each case")
+    args = parser.parse_args()
+
+    access_token = token_handler.create_access_token(CLAIMS, timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES))
+    refresh_token = token_handler.create_refresh_token(CLAIMS)
+    reset_token = token_handler.create_reset_password_token(EMAIL)
+    legacy_access = legacy_issue(settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+    legacy_refresh = legacy_issue(settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES)
+    legacy_reset = legacy_reset_issue()
+
+    cases = [
+        ("access issue", lambda: legacy_issue(settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES),
+         lambda: token_handler.create_access_token(CLAIMS, timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES))),
+        ("access verify", lambda: legacy_verify(legacy_access), lambda: token_handler.verify(access_token)),
+        ("refresh issue", lambda: legacy_issue(settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES),
+         lambda: token_handler.create_refresh_token(CLAIMS)),
+        ("refresh verify", lambda: legacy_verify(legacy_refresh), lambda: token_handler.verify(refresh_token)),
+        ("reset issue", legacy_reset_issue, lambda: token_handler.create_reset_password_token(EMAIL)),
+        ("reset verify", lambda: legacy_reset_verify(legacy_reset),
+         lambda: token_handler.verify_reset_password_token(reset_token)),
+    ]
+
+    print(f"{settings.JWT_ALGORITHM}, {len(token_handler.keys.keys)} signing key(s), ops/s on one core")
+    for name, legacy, current in cases:
+        before = ops_per_second(legacy, args.seconds)
+        after = ops_per_second(current, args.seconds)
+        print(f"{name:<16} per call {before:10.0f}  reused {after:10.0f}  x{after / before:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
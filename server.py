@@ -1,9 +1,15 @@
+import os
 import uvicorn
 from app.config import settings
+from app.auth.auth_handler import calibrate_bcrypt_rounds
 
 def main() -> None:
     
     print(f"Starting server... {settings.HOST}:{settings.PORT}")
+    # calibrate once here so every worker hashes with the same cost
+    if not settings.PASSWORD_HASH_ROUNDS:
+        os.environ["PASSWORD_HASH_ROUNDS"] = str(calibrate_bcrypt_rounds())
+        print(f"bcrypt cost calibrated to {os.environ['PASSWORD_HASH_ROUNDS']} rounds")
     """Entrypoint of the application."""
     uvicorn.run(
         "app.app:get_app",
@@ -12,6 +18,9 @@ def main() -> None:
         port=settings.PORT,
         reload=settings.RELOAD,
         factory=True,
+        # behind a proxy request.client is the address it forwarded, not the proxy's own
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
     )
 
 
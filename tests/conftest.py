@@ -0,0 +1,18 @@
+import os
+
+# the settings the app refuses to start without, tests need no real database or secrets
+for name, value in {
+    "APP_NAME": "complaints-test",
+    "DATABASE_HOST": "localhost",
+    "DATABASE_PORT": "5432",
+    "DATABASE_NAME": "complaints",
+    "DATABASE_USER": "complaints",
+    "DATABASE_PASSWORD": "complaints",
+    "API_PREFIX": "/api/v1",
+    "JWT_SECRET_KEY": "test-secret-key-long-enough-for-hs256",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "JWT_REFRESH_TOKEN_EXPIRE_MINUTES": "100",
+    "EMAIL_TOKEN_SALT": "test-salt",
+}.items():
+    os.environ.setdefault(name, value)
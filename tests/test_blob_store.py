@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from starlette.datastructures import UploadFile
+
+from app.common.blob_store import BLOB_DIRECTORY, BlobStore, blob_paths, is_blob_path
+from app.common.image_variants import VARIANT_DIRECTORY
+
+DIGEST = "ab" + "0" * 62
+
+
+def test_only_store_written_paths_are_blob_paths():
+    assert is_blob_path(f"{BLOB_DIRECTORY}/ab/{DIGEST}.jpg")
+    assert is_blob_path(f"{BLOB_DIRECTORY}/ab/{DIGEST}")
+    # traversal, wrong shard, short digest, outside the store
+    assert not is_blob_path(f"{BLOB_DIRECTORY}/../../../app/secret.py")
+    assert not is_blob_path(f"{BLOB_DIRECTORY}/ab/../ab/{DIGEST}.jpg")
+    assert not is_blob_path(f"{BLOB_DIRECTORY}/cd/{DIGEST}.jpg")
+    assert not is_blob_path(f"{BLOB_DIRECTORY}/ab/{DIGEST[:10]}.jpg")
+    assert not is_blob_path(f"storage/images/{DIGEST}.jpg")
+
+
+def test_symlink_out_of_the_store_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "secret.py").write_text("")
+    os.makedirs(f"{BLOB_DIRECTORY}/ab")
+    os.symlink(tmp_path / "secret.py", f"{BLOB_DIRECTORY}/ab/{DIGEST}.jpg")
+
+    assert blob_paths(f"{BLOB_DIRECTORY}/ab/{DIGEST}.jpg") == []
+
+
+def test_same_bytes_under_different_extensions_are_one_blob(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = b"\xff\xd8\xff" + os.urandom(1024)
+    uploads = [UploadFile(file=io.BytesIO(data), filename=name) for name in ("photo.jpg", "photo.JPEG")]
+
+    paths = asyncio.run(BlobStore().save_all(uploads))
+
+    digest = hashlib.sha256(data).hexdigest()
+    assert paths[0] == paths[1] == f"{BLOB_DIRECTORY}/{digest[:2]}/{digest}"
+    assert BlobStore._content_type(paths[0]) == "image/jpeg"
+
+
+def test_variants_stay_while_another_copy_of_the_digest_exists(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(f"{BLOB_DIRECTORY}/ab")
+    os.makedirs(VARIANT_DIRECTORY)
+    blob, legacy = f"{BLOB_DIRECTORY}/ab/{DIGEST}", f"{BLOB_DIRECTORY}/ab/{DIGEST}.jpg"
+    thumbnail = Path(VARIANT_DIRECTORY) / f"{DIGEST}_thumbnail.webp"
+    for path in (blob, legacy, thumbnail):
+        Path(path).write_bytes(b"")
+    cutoff = datetime.utcnow() + timedelta(seconds=60)
+
+    assert BlobStore._remove_files([blob], cutoff) == 1
+    assert thumbnail.exists()
+    assert BlobStore._remove_files([legacy], cutoff) == 1
+    assert not thumbnail.exists()
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.complaint.service import ComplaintService
+from app.config import settings
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def read_rows(content_type: str, *chunks: bytes) -> list:
+    async def run():
+        return [row async for row in ComplaintService.iter_bulk_rows(stream(*chunks), content_type)]
+    return asyncio.run(run())
+
+
+def test_ndjson_lines_split_across_chunks():
+    rows = read_rows("application/x-ndjson", b'{"a": 1}\n{"a"', b': 2}\n\n{"a": 3}')
+    assert rows == [(0, b'{"a": 1}'), (1, b'{"a": 2}'), (2, b'{"a": 3}')]
+
+
+def test_ndjson_line_over_the_cap_is_refused(monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_LINE_BYTES", 16)
+    # never terminated, the buffer must not keep growing
+    with pytest.raises(HTTPException) as error:
+        read_rows("application/x-ndjson", b'{"a": 1}\n', b"x" * 10, b"x" * 10)
+    assert error.value.status_code == 413
+
+
+@pytest.mark.parametrize("content_type", ["application/json", "application/x-ndjson"])
+def test_body_over_the_cap_is_refused(monkeypatch, content_type):
+    monkeypatch.setattr(settings, "BULK_MAX_BYTES", 32)
+    with pytest.raises(HTTPException) as error:
+        read_rows(content_type, b'[{"a": 1},\n', b'{"a": 2},\n' * 4, b"]")
+    assert error.value.status_code == 413
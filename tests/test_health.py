@@ -0,0 +1,14 @@
+from app.api.health.service import get_head_revision, get_known_revisions, is_migrated
+
+
+def test_database_at_or_past_the_head_is_migrated():
+    head = get_head_revision()
+    assert is_migrated(head)
+    # migrated by a newer deploy this process doesn't have the scripts for yet
+    assert is_migrated("0123456789ab")
+
+
+def test_database_behind_the_head_is_not_migrated():
+    behind = next(revision for revision in get_known_revisions() if revision != get_head_revision())
+    assert not is_migrated(behind)
+    assert not is_migrated(None)
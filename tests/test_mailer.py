@@ -0,0 +1,124 @@
+import asyncio
+import socket
+from email import message_from_bytes, policy
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.common.mailer import MailQueue, MailQueueFull
+from app.config import settings
+
+
+class RecordingHandler:
+    def __init__(self) -> None:
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = RecordingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", port)
+    monkeypatch.setattr(settings, "SMTP_USERNAME", None)
+    monkeypatch.setattr(settings, "MAIL_FROM", "no-reply@complaints.test")
+    yield handler
+    controller.stop()
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_queued_mail_is_delivered(smtp_server):
+    async def run():
+        queue = MailQueue()
+        queue.start()
+        assert queue.enqueue("citizen@example.org", "Reset your password", "use this link: https://x/reset?token=abc")
+        await wait_for(lambda: smtp_server.envelopes)
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(run())
+
+    envelope, = smtp_server.envelopes
+    assert envelope.mail_from == "no-reply@complaints.test"
+    assert envelope.rcpt_tos == ["citizen@example.org"]
+    message = message_from_bytes(envelope.content, policy=policy.default)
+    assert message["Subject"] == "Reset your password"
+    assert message["To"] == "citizen@example.org"
+    assert "https://x/reset?token=abc" in message.get_content()
+    assert queue.stats()["sent"] == 1
+
+
+def test_batch_goes_out_over_pooled_connections(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "MAIL_WORKERS", 2)
+    monkeypatch.setattr(settings, "MAIL_BATCH_SIZE", 10)
+
+    async def run():
+        queue = MailQueue()
+        queue.start()
+        for i in range(25):
+            queue.enqueue(f"user{i}@example.org", "Activate your account", "hi")
+        await wait_for(lambda: len(smtp_server.envelopes) == 25)
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert sorted(rcpt for envelope in smtp_server.envelopes for rcpt in envelope.rcpt_tos) == \
+        sorted(f"user{i}@example.org" for i in range(25))
+
+
+def test_failed_send_is_retried(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "MAIL_RETRY_BASE_SECONDS", 0.05)
+    original_port = settings.SMTP_PORT
+
+    async def run():
+        # nothing listens there, the first attempt fails
+        monkeypatch.setattr(settings, "SMTP_PORT", free_port())
+        queue = MailQueue()
+        queue.start()
+        queue.enqueue("late@example.org", "Reset your password", "hi")
+        await asyncio.sleep(0.02)
+        monkeypatch.setattr(settings, "SMTP_PORT", original_port)
+        await wait_for(lambda: smtp_server.envelopes)
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert smtp_server.envelopes[0].rcpt_tos == ["late@example.org"]
+
+
+def test_disabled_without_smtp_host(monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_HOST", None)
+    queue = MailQueue()
+    assert queue.enqueue("citizen@example.org", "Reset your password", "hi") is False
+
+
+def test_full_queue_raises_instead_of_returning_false(monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "MAIL_QUEUE_SIZE", 1)
+    queue = MailQueue()
+
+    async def run():
+        assert queue.enqueue("first@example.org", "Reset your password", "hi") is True
+        with pytest.raises(MailQueueFull):
+            queue.enqueue("second@example.org", "Reset your password", "hi")
+
+    asyncio.run(run())
+    assert queue.dropped == 1
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from moto import mock_aws
+from starlette.datastructures import Headers, UploadFile
+
+from app.common.storage import ObjectStorage
+from app.config import settings
+
+BUCKET = "complaint-images"
+# the smallest part s3 (and moto) accept for every part but the last
+PART_SIZE = 5 * 1024 * 1024
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setattr(settings, "AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setattr(settings, "AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(settings, "AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setattr(settings, "AWS_S3_BUCKET_NAME", BUCKET)
+    monkeypatch.setattr(settings, "AWS_S3_ENDPOINT_URL", None)
+    monkeypatch.setattr(settings, "S3_MULTIPART_PART_SIZE", PART_SIZE)
+    monkeypatch.setattr(settings, "S3_MULTIPART_CONCURRENCY", 2)
+    with mock_aws():
+        storage = ObjectStorage()
+        storage.client.create_bucket(Bucket=BUCKET)
+        yield storage
+        storage.close()
+
+
+def upload_file(data: bytes, filename: str = "photo.jpg") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename, headers=Headers({"content-type": "image/jpeg"}))
+
+
+# records every call the storage makes, by method name
+def record_calls(storage: ObjectStorage, monkeypatch) -> list:
+    calls = []
+    for method in ("put_object", "create_multipart_upload", "upload_part",
+                   "complete_multipart_upload", "abort_multipart_upload"):
+        original = getattr(storage.client, method)
+
+        def recorder(original=original, method=method, **kwargs):
+            calls.append((method, kwargs))
+            return original(**kwargs)
+        monkeypatch.setattr(storage.client, method, recorder)
+    return calls
+
+
+def test_small_file_is_a_single_put(storage, monkeypatch):
+    calls = record_calls(storage, monkeypatch)
+    data = os.urandom(1024)
+
+    url = asyncio.run(storage.stream_upload(upload_file(data), "small.jpg", "image/jpeg"))
+
+    assert [method for method, _ in calls] == ["put_object"]
+    stored = storage.client.get_object(Bucket=BUCKET, Key="small.jpg")
+    assert stored["Body"].read() == data
+    assert stored["ContentType"] == "image/jpeg"
+    assert url == f"https://{BUCKET}.s3.amazonaws.com/small.jpg"
+
+
+def test_large_file_goes_up_in_ordered_parts(storage, monkeypatch):
+    calls = record_calls(storage, monkeypatch)
+    data = os.urandom(2 * PART_SIZE + 1234)
+
+    asyncio.run(storage.stream_upload(upload_file(data), "large.jpg", "image/jpeg"))
+
+    methods = [method for method, _ in calls]
+    assert methods[0] == "create_multipart_upload"
+    assert methods.count("upload_part") == 3
+    assert methods[-1] == "complete_multipart_upload"
+    assert "abort_multipart_upload" not in methods
+
+    # completed with the parts in order and the etags s3 returned for them
+    parts = calls[-1][1]["MultipartUpload"]["Parts"]
+    assert [part["PartNumber"] for part in parts] == [1, 2, 3]
+    chunks = [data[i:i + PART_SIZE] for i in range(0, len(data), PART_SIZE)]
+    assert [part["ETag"].strip('"') for part in parts] == [hashlib.md5(chunk).hexdigest() for chunk in chunks]
+
+    stored = storage.client.get_object(Bucket=BUCKET, Key="large.jpg")
+    assert stored["Body"].read() == data
+    assert stored["ETag"].strip('"').endswith("-3")
+
+
+def test_failed_part_aborts_the_upload(storage, monkeypatch):
+    calls = record_calls(storage, monkeypatch)
+    upload_part = storage.client.upload_part
+
+    def failing_upload_part(**kwargs):
+        if kwargs["PartNumber"] == 2:
+            raise ConnectionError("connection reset")
+        return upload_part(**kwargs)
+    monkeypatch.setattr(storage.client, "upload_part", failing_upload_part)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(storage.stream_upload(
+            upload_file(os.urandom(3 * PART_SIZE)), "broken.jpg", "image/jpeg"))
+
+    methods = [method for method, _ in calls]
+    assert "complete_multipart_upload" not in methods
+    assert methods[-1] == "abort_multipart_upload"
+    assert not storage.client.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+    assert "Contents" not in storage.client.list_objects_v2(Bucket=BUCKET)
+
+
+def test_put_if_absent_keeps_the_first_write(storage, monkeypatch):
+    calls = record_calls(storage, monkeypatch)
+
+    async def run():
+        return (await storage.put_if_absent("images/a.jpg", b"first", "image/jpeg"),
+                await storage.put_if_absent("images/a.jpg", b"second", "image/jpeg"))
+
+    (_, created), (url, created_again) = asyncio.run(run())
+
+    assert created is True and created_again is False
+    assert url == f"https://{BUCKET}.s3.amazonaws.com/images/a.jpg"
+    # no head_object round trip, one conditional put each
+    assert [method for method, _ in calls] == ["put_object", "put_object"]
+    assert storage.client.get_object(Bucket=BUCKET, Key="images/a.jpg")["Body"].read() == b"first"
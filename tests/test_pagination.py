@@ -0,0 +1,21 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.common.pagination import SortOrder, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    value, id = datetime(2026, 10, 18, 12, 30), uuid.uuid4()
+    cursor = encode_cursor(value, id, "created_at", SortOrder.asc)
+    assert decode_cursor(cursor, "created_at", SortOrder.asc) == (value, id)
+
+
+@pytest.mark.parametrize("sort_key, order", [("updated_at", SortOrder.asc), ("created_at", SortOrder.desc)])
+def test_cursor_of_another_sort_is_refused(sort_key, order):
+    cursor = encode_cursor(datetime(2026, 10, 18), uuid.uuid4(), "created_at", SortOrder.asc)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, sort_key, order)
+    assert error.value.status_code == 400